@@ -1,48 +1,73 @@
 import json
+import os
 import torch
-from transformers import DistilBertTokenizer, DistilBertModel
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
 from sklearn.preprocessing import normalize
 import numpy as np
+from functools import lru_cache
+from inference_backends import load_encoder
+from embedding_service import shared_embedding_service
+from tweet_stream import chunked, stream_tweets
+from tweet_batch import as_batch
+# Tokenizer and stopwords are bundled, so nothing is downloaded at import
+from text_preprocessing import preprocess_texts
 
-# Download NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
-
-# Load DistilBERT model and tokenizer
-tokenizer = DistilBertTokenizer.from_pretrained("distilbert-base-uncased")
-model = DistilBertModel.from_pretrained("distilbert-base-uncased")
-
-def preprocess_tweets(tweets):
-    """Clean tweet text for analysis."""
-    stop_words = set(stopwords.words('english'))
-    cleaned_tweets = []
-    for tweet in tweets:
-        text = tweet['text'].lower()
-        # Remove URLs, hashtags, mentions
-        text = ' '.join(word for word in text.split() if not (word.startswith('#') or word.startswith('@') or 'http' in word))
-        # Tokenize and remove stopwords
-        tokens = word_tokenize(text)
-        tokens = [t for t in tokens if t.isalpha() and t not in stop_words]
-        cleaned_tweets.append(' '.join(tokens))
-    return cleaned_tweets
-
-def extract_features(cleaned_tweets):
+# DistilBERT model and tokenizer (ENCODER_BACKEND: torch, int8 or onnx), loaded on first use
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+
+@lru_cache(maxsize=1)
+def get_encoder():
+    return load_encoder("distilbert-base-uncased", ENCODER_BACKEND)
+
+# Avatar features come from the shared sentence-embedding store ("shared"), the same
+# vectors the API uses for topics, or from a separate DistilBERT pass ("distilbert")
+AVATAR_FEATURES = os.environ.get("AVATAR_FEATURES", "shared")
+DISTILBERT_DIM = 768
+
+# Tweets per DistilBERT forward pass, and torch intra-op threads (0 keeps torch's default)
+EXTRACT_BATCH_SIZE = int(os.environ.get("EXTRACT_BATCH_SIZE", "32"))
+EXTRACT_NUM_THREADS = int(os.environ.get("EXTRACT_NUM_THREADS", "0"))
+if EXTRACT_NUM_THREADS:
+    torch.set_num_threads(EXTRACT_NUM_THREADS)
+# Tweets preprocessed and encoded together when streaming a large archive
+AVATAR_CHUNK_SIZE = int(os.environ.get("AVATAR_CHUNK_SIZE", "1000"))
+
+def preprocess_tweets(tweets, workers=None):
+    """Clean tweet text for analysis; `tweets` is a TweetBatch or a list of tweet dicts.
+
+    With `workers` (default PREPROCESS_WORKERS) above 1, large batches are
+    cleaned on a process pool in chunks.
+    """
+    return preprocess_texts(as_batch(tweets).lowered_texts(), workers)
+
+def encode_tweets(cleaned_tweets, batch_size=None):
+    """Attention-mask-weighted mean-pooled DistilBERT embedding per non-empty tweet."""
+    texts = [text for text in cleaned_tweets if text.strip()]
+    if not texts:
+        return np.zeros((0, DISTILBERT_DIM), dtype=np.float32)
+    batch_size = batch_size or EXTRACT_BATCH_SIZE
+    tokenizer, model = get_encoder()
+    # Tokenize once without padding, then pad each length-sorted batch only to its own longest tweet
+    encoded = tokenizer(texts, truncation=True, max_length=512)
+    order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+    embeddings = np.zeros((len(texts), DISTILBERT_DIM), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch = tokenizer.pad({
+                "input_ids": [encoded["input_ids"][i] for i in indices],
+                "attention_mask": [encoded["attention_mask"][i] for i in indices]
+            }, return_tensors="pt")
+            hidden = model(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            embeddings[indices] = pooled.float().numpy()
+    return embeddings
+
+def extract_features(cleaned_tweets, batch_size=None):
     """Extract linguistic features using DistilBERT."""
-    embeddings = []
-    for text in cleaned_tweets:
-        if not text.strip():
-            continue
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512, padding=True)
-        with torch.no_grad():
-            outputs = model(**inputs)
-        # Use mean of last hidden state as embedding
-        embedding = outputs.last_hidden_state.mean(dim=1).squeeze().numpy()
-        embeddings.append(embedding)
-    if not embeddings:
-        return np.zeros(768)  # DistilBERT embedding size
+    embeddings = encode_tweets(cleaned_tweets, batch_size)
+    if not len(embeddings):
+        return np.zeros(embeddings.shape[1])
     # Average embeddings
     return normalize(np.mean(embeddings, axis=0).reshape(1, -1))[0]
 
@@ -62,23 +87,38 @@ def infer_big5_features(features):
         "Neuroticism": neuroticism
     }
 
-def infer_attributes(tweets):
+ATTRIBUTE_KEYWORDS = {
+    "ai": ['ai', 'machine learning', 'distilbert'],
+    "blockchain": ['blockchain', 'base', 'web3'],
+    "coding": ['coding', 'developer'],
+    "tech_events": ['san francisco', 'sf'],
+    "transparency": ['open-source', 'ethics'],
+    "web3": ['web3'],
+    "enthusiastic": ['excited', '🔥']
+}
+
+def attribute_flags(tweets):
+    """Keyword flags found in a batch of tweets; flags from several chunks combine with |."""
+    text = as_batch(tweets).lowered
+    return {flag for flag, words in ATTRIBUTE_KEYWORDS.items() if any(word in text for word in words)}
+
+def infer_attributes(tweets, flags=None):
     """Infer values, interests, goals, and communication style."""
-    text = ' '.join(tweet['text'].lower() for tweet in tweets)
     # Keyword-based inference (simplified)
+    flags = attribute_flags(tweets) if flags is None else flags
     interests = []
-    if 'ai' in text or 'machine learning' in text or 'distilbert' in text:
+    if "ai" in flags:
         interests.append("Artificial Intelligence")
-    if 'blockchain' in text or 'base' in text or 'web3' in text:
+    if "blockchain" in flags:
         interests.append("Blockchain")
-    if 'coding' in text or 'developer' in text:
+    if "coding" in flags:
         interests.append("Coding")
-    if 'san francisco' in text or 'sf' in text:
+    if "tech_events" in flags:
         interests.append("Tech Events")
 
-    values = ["Innovation", "Transparency"] if 'open-source' in text or 'ethics' in text else ["Innovation"]
-    goals = ["Build decentralized solutions"] if 'web3' in text else ["Advance technology"]
-    communication_style = "Enthusiastic and technical" if any(word in text for word in ['excited', '🔥']) else "Informative"
+    values = ["Innovation", "Transparency"] if "transparency" in flags else ["Innovation"]
+    goals = ["Build decentralized solutions"] if "web3" in flags else ["Advance technology"]
+    communication_style = "Enthusiastic and technical" if "enthusiastic" in flags else "Informative"
 
     return {
         "interests": interests,
@@ -87,16 +127,35 @@ def infer_attributes(tweets):
         "communication_style": communication_style
     }
 
-def generate_avatar(tweets, username):
-    """Generate Deep Personality Avatar."""
-    # Preprocess tweets
-    cleaned_tweets = preprocess_tweets(tweets)
-    # Extract features
-    features = extract_features(cleaned_tweets)
+def generate_avatar(tweets, username, chunk_size=None):
+    """Generate Deep Personality Avatar.
+
+    `tweets` may be any iterable, e.g. a stream over a large archive; it is
+    consumed chunk by chunk so memory stays flat regardless of its size.
+    """
+    embedding_service = shared_embedding_service()
+    embedding_sum = 0.0
+    embedding_count = 0
+    flags = set()
+    for chunk in chunked(tweets, chunk_size or AVATAR_CHUNK_SIZE):
+        chunk = as_batch(chunk)
+        if AVATAR_FEATURES == "shared":
+            # Raw tweet text, so vectors already computed for topics are reused
+            embeddings = embedding_service.embed([text for text in chunk.texts() if text.strip()])
+        else:
+            # Preprocess tweets, then extract DistilBERT features
+            embeddings = encode_tweets(preprocess_tweets(chunk))
+        embedding_sum = embedding_sum + embeddings.astype(np.float64).sum(axis=0)
+        embedding_count += len(embeddings)
+        flags |= attribute_flags(chunk)
+    if embedding_count:
+        features = normalize((embedding_sum / embedding_count).reshape(1, -1))[0]
+    else:
+        features = np.zeros(embedding_service.dimension if AVATAR_FEATURES == "shared" else DISTILBERT_DIM)
     # Infer Big 5 traits
     big5_traits = infer_big5_features(features)
     # Infer other attributes
-    attributes = infer_attributes(tweets)
+    attributes = infer_attributes([], flags)
 
     # Structure avatar
     avatar = {
@@ -121,10 +180,9 @@ def generate_avatar(tweets, username):
     return avatar
 
 if __name__ == "__main__":
-    # Load mock tweets
+    # Stream mock tweets ({username}_tweets.json array or {username}_tweets.ndjson)
     username = "alex.base"
-    with open(f"{username}_tweets.json", "r") as f:
-        tweets = json.load(f)
+    tweets = stream_tweets(username)
     # Generate avatar
     avatar = generate_avatar(tweets, username)
     # Print summary
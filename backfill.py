@@ -0,0 +1,237 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from tweet_stream import chunked, iter_tweets
+
+MANIFEST = "backfill.json"
+
+# Set in each worker process by init_worker
+_pipeline = None
+_avatars = None
+
+
+def shard_of(username: str, shards: int) -> int:
+    return zlib.crc32(username.encode("utf-8")) % shards
+
+
+def iter_users(source: Dict) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+    """(username, tweets) from the input file, then --usernames (tweets None: loaded from {username}_tweets.json)."""
+    if source.get("input"):
+        for entry in iter_tweets(source["input"]):
+            yield entry["username"], entry["tweets"]
+    for username in source.get("usernames", []):
+        yield username, None
+
+
+def shard_paths(out_dir: str, shard: int) -> Tuple[str, str, str]:
+    """Results, checkpoint and input of one shard."""
+    base = os.path.join(out_dir, f"shard-{shard:05d}")
+    return base + ".ndjson", base + ".checkpoint.json", base + ".input.ndjson"
+
+
+def partition_input(source: Dict, shards: int, out_dir: str) -> int:
+    """Split the users into per-shard input files in one pass over the source; returns the user count.
+
+    Each shard then reads only its own users, in input order, so a
+    checkpoint's count says exactly where to resume.
+    """
+    files = [open(shard_paths(out_dir, shard)[2], "w") for shard in range(shards)]
+    total = 0
+    try:
+        for username, tweets in iter_users(source):
+            files[shard_of(username, shards)].write(json.dumps({"username": username, "tweets": tweets}) + "\n")
+            total += 1
+    finally:
+        for f in files:
+            f.close()
+    return total
+
+
+def shard_users(out_dir: str, shard: int) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+    return ((entry["username"], entry["tweets"]) for entry in iter_tweets(shard_paths(out_dir, shard)[2]))
+
+
+def load_checkpoint(out_dir: str, shard: int) -> Dict:
+    try:
+        with open(shard_paths(out_dir, shard)[1], "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"shard": shard, "done": 0, "failed": 0, "bytes": 0, "complete": False}
+
+
+def save_checkpoint(out_dir: str, checkpoint: Dict):
+    path = shard_paths(out_dir, checkpoint["shard"])[1]
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+
+def init_worker(threads: int, avatars: bool, worker_ids):
+    """Load the pipeline (and with it every model) once per worker process.
+
+    Each worker gets its own IPFS spool and pin index (IPFS_SPOOL_DIR-worker-N,
+    IPFS_INDEX_PATH with -worker-N before the extension), so their flusher
+    threads never race over the same files. N counts up from 0 in every run,
+    so uploads still spooled when a run ends are flushed by the next one.
+    """
+    global _pipeline, _avatars
+    with worker_ids.get_lock():
+        worker = worker_ids.value
+        worker_ids.value += 1
+    index_base, index_ext = os.path.splitext(os.environ.get("IPFS_INDEX_PATH", "ipfs_index.sqlite3"))
+    os.environ["IPFS_SPOOL_DIR"] = f"{os.environ.get('IPFS_SPOOL_DIR', 'ipfs_spool')}-worker-{worker}"
+    os.environ["IPFS_INDEX_PATH"] = f"{index_base}-worker-{worker}{index_ext}"
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import main
+    _pipeline = main
+    main.ipfs_publisher.start()
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    if avatars:
+        import analyze_personality
+        _avatars = analyze_personality
+
+
+def run_shard(shard: int, out_dir: str, chunk_size: int) -> Dict:
+    """Generate one shard's users into its NDJSON file, checkpointing after every chunk.
+
+    Output is fsynced before the checkpoint that covers it is written, and a
+    resumed shard first truncates anything written after its last checkpoint,
+    so an interrupted run never loses or duplicates a user. Users without
+    tweets get an error entry and count as failed.
+    """
+    from load_tweets import load_tweets
+    from tweet_batch import TweetBatch
+
+    checkpoint = load_checkpoint(out_dir, shard)
+    if checkpoint["complete"]:
+        return checkpoint
+    users = itertools.islice(shard_users(out_dir, shard), checkpoint["done"], None)
+    with open(shard_paths(out_dir, shard)[0], "ab") as out:
+        out.truncate(checkpoint["bytes"])
+        for chunk in chunked(users, chunk_size):
+            tweets = [tweets if tweets is not None else load_tweets(username) for username, tweets in chunk]
+            batch = [(username, TweetBatch.from_dicts(user_tweets)) for (username, _), user_tweets in zip(chunk, tweets) if user_tweets]
+            results = _pipeline.generate_batch_results(batch)
+            lines = []
+            for (username, _), user_tweets in zip(chunk, tweets):
+                result = next(results) if user_tweets else {"username": username, "error": "No tweets"}
+                if _avatars is not None and "error" not in result:
+                    try:
+                        result["avatar"] = _avatars.generate_avatar(user_tweets, result["username"])
+                    except Exception as e:
+                        result["error"] = f"avatar: {e}"
+                checkpoint["failed"] += "error" in result
+                lines.append(json.dumps(result) + "\n")
+            out.write("".join(lines).encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint["done"] += len(chunk)
+            checkpoint["bytes"] = out.tell()
+            save_checkpoint(out_dir, checkpoint)
+    checkpoint["complete"] = True
+    save_checkpoint(out_dir, checkpoint)
+    return checkpoint
+
+
+def prepare_out_dir(out_dir: str, source: Dict, shards: int, restart: bool) -> Dict:
+    """Manifest of this output store, splitting the input into shards when the store is new.
+
+    A resumed store must be fed the same input it started with; its shard
+    count and per-shard inputs are kept from the first run.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, MANIFEST)
+    manifest = dict(source)
+    if source.get("input"):
+        stat = os.stat(source["input"])
+        manifest.update({"input": os.path.abspath(source["input"]), "input_size": stat.st_size, "input_mtime": stat.st_mtime})
+    if os.path.exists(path) and not restart:
+        with open(path, "r") as f:
+            previous = json.load(f)
+        if {key: previous.get(key) for key in manifest} != manifest:
+            raise SystemExit(f"{out_dir} holds a backfill of different input; pass --restart to start over")
+        return previous
+    # Also clears what an interrupted split left behind; the manifest is only written once it finished
+    for name in os.listdir(out_dir):
+        if name.startswith("shard-"):
+            os.remove(os.path.join(out_dir, name))
+    manifest["shards"] = shards
+    manifest["users"] = partition_input(source, shards, out_dir)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def progress(out_dir: str, shards: int) -> Tuple[int, int]:
+    checkpoints = [load_checkpoint(out_dir, shard) for shard in range(shards)]
+    return sum(c["done"] for c in checkpoints), sum(c["failed"] for c in checkpoints)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m{seconds % 60:02d}s"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate reports and trivia for many users on every core, resumably.")
+    parser.add_argument("input", nargs="?", help="JSON array or NDJSON file of {username, tweets} entries")
+    parser.add_argument("--usernames", nargs="+", default=[], help="Users to load from {username}_tweets.json")
+    parser.add_argument("--out-dir", default="backfill", help="Per-shard NDJSON results and checkpoints")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument("--shards", type=int, help="Shards to split users into (default 4 per worker; fixed once a store exists)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="torch threads in each worker")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Users per pooled inference pass and per checkpoint")
+    parser.add_argument("--avatars", action="store_true", help="Also run generate_avatar for every user")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--restart", action="store_true", help="Discard existing results in --out-dir")
+    args = parser.parse_args()
+
+    source = {"input": args.input, "usernames": args.usernames}
+    if not args.input and not args.usernames:
+        parser.error("Provide an input file or --usernames")
+    # Workers inherit the environment; keep N processes from each logging every request
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    manifest = prepare_out_dir(args.out_dir, source, args.shards or args.workers * 4, args.restart)
+    shards, total = manifest["shards"], manifest["users"]
+    pending = [shard for shard in range(shards) if not load_checkpoint(args.out_dir, shard)["complete"]]
+    started_done, _ = progress(args.out_dir, shards)
+    print(f"Backfilling {total} users in {shards} shards on {args.workers} workers "
+          f"({started_done} already done, {len(pending)} shards left)", file=sys.stderr)
+
+    started = time.monotonic()
+    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                               initargs=(args.threads_per_worker, args.avatars, multiprocessing.Value("i", 0)))
+    try:
+        futures = {pool.submit(run_shard, shard, args.out_dir, args.chunk_size): shard for shard in pending}
+        remaining = set(futures)
+        while remaining:
+            finished, remaining = wait(remaining, timeout=args.progress_interval, return_when=FIRST_COMPLETED)
+            for future in finished:
+                future.result()  # a failed shard stops the run; its checkpoint keeps the progress
+            done, failed = progress(args.out_dir, shards)
+            rate = (done - started_done) / max(time.monotonic() - started, 1e-9)
+            eta = format_duration((total - done) / rate) if rate > 0 else "?"
+            print(f"{done}/{total} users ({failed} failed), {rate:.2f} users/s, ETA {eta}", file=sys.stderr)
+    except (KeyboardInterrupt, Exception) as e:
+        pool.shutdown(wait=False, cancel_futures=True)
+        reason = "Interrupted" if isinstance(e, KeyboardInterrupt) else f"Backfill failed: {e}"
+        print(f"{reason}; rerun with --out-dir {args.out_dir} to resume", file=sys.stderr)
+        sys.exit(130 if isinstance(e, KeyboardInterrupt) else 1)
+    pool.shutdown()
+
+    done, failed = progress(args.out_dir, shards)
+    elapsed = time.monotonic() - started
+    print(f"Generated {done - failed}/{done} users in {format_duration(elapsed)} "
+          f"({(done - started_done) / max(elapsed, 1e-9):.2f} users/s); results in {args.out_dir}/shard-*.ndjson", file=sys.stderr)
+    sys.exit(1 if failed else 0)
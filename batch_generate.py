@@ -0,0 +1,63 @@
+import argparse
+import json
+import sys
+
+from load_tweets import load_tweets
+
+
+def read_users(path):
+    """Read [{"username": ..., "tweets": [...]}, ...] from a JSON array or NDJSON file."""
+    with open(path, "r") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+    return [(entry["username"], entry["tweets"]) for entry in entries]
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate personality reports and trivia for many users.")
+    parser.add_argument("input", nargs="?", help="JSON array or NDJSON file of {username, tweets} entries")
+    parser.add_argument("--usernames", nargs="+", default=[], help="Users to load from {username}_tweets.json")
+    parser.add_argument("--out", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Users per pooled inference pass")
+    args = parser.parse_args()
+
+    users = read_users(args.input) if args.input else []
+    users += [(username, load_tweets(username)) for username in args.usernames]
+    if not users:
+        parser.error("Provide an input file or --usernames")
+
+    # Importing main loads the models
+    from main import MAX_TWEETS_PER_USER, generate_batch_results
+
+    # Same per-user limits as /generateBatch; a missing or empty archive is an error, not a default report
+    valid = []
+    rejected = []
+    for username, tweets in users:
+        if not tweets or len(tweets) > MAX_TWEETS_PER_USER:
+            rejected.append({"username": username, "error": f"Provide 1–{MAX_TWEETS_PER_USER} tweets"})
+        else:
+            valid.append((username, tweets))
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    failed = 0
+    try:
+        for result in rejected:
+            out.write(json.dumps(result) + "\n")
+        failed += len(rejected)
+        for chunk in chunked(valid, args.chunk_size):
+            for result in generate_batch_results(chunk):
+                failed += "error" in result
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Generated {len(users) - failed}/{len(users)} users", file=sys.stderr)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,256 @@
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from ipfs_cid import canonical_json, compute_cid
+from topic_index import TopicIndex
+
+SIZES = (5, 50, 500, 5000)
+EMBEDDING_DIM = 384
+ENCODER_DIM = 768
+ENCODER_VOCAB = 8192
+
+PHRASES = [
+    "Just attended a Base hackathon! Loved the Web3 vibe. #Base #Web3",
+    "Working on a new AI model, any fine-tuning tips? #AI #MachineLearning",
+    "Late-night tacos with the crew 🌮",
+    "Party with friends tonight! #vibes",
+    "Blockchain is the future of trust. Excited to build onchain!",
+    "Reading about philosophy and the meaning of open source",
+    "lol this meme is too real 😂",
+    "Debugging python at 3am again, send coffee",
+    "gm frens, shipping something new today",
+    "Thread: why decentralized identity matters, and what most people get wrong about wallets, keys and recovery",
+    "Feeling stressed about deadlines but grateful for the team",
+    "Hot take: tabs are better than spaces"
+]
+
+
+def synthetic_tweets(count: int, seed: int = 0) -> List[Dict]:
+    """Deterministic tweets mixing topic, style and sentiment keywords over a year of timestamps."""
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    tweets = []
+    for i in range(count):
+        text = " ".join(rng.sample(PHRASES, rng.randint(1, 2)))
+        created_at = start + datetime.timedelta(seconds=rng.randrange(365 * 86400))
+        tweets.append({"text": f"{text} ({i})", "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%SZ")})
+    return tweets
+
+
+def load_datasets(sizes) -> Dict[str, List[Dict]]:
+    with open("alex.base_tweets.json", "r") as f:
+        datasets = {"alex": json.load(f)}
+    for size in sizes:
+        datasets[f"synthetic_{size}"] = synthetic_tweets(size, seed=size)
+    return datasets
+
+
+class StubSentiment:
+    """Deterministic stand-in for the sentiment pipeline: label from a CRC of the text."""
+
+    def __call__(self, texts, **kwargs):
+        labels = ["1 star", "2 stars", "3 stars", "4 stars", "5 stars"]
+        return [{"label": labels[zlib.crc32(text.encode("utf-8")) % 5], "score": 1.0} for text in texts]
+
+
+class StubEmbedder:
+    """Deterministic stand-in for SentenceTransformer: a unit vector seeded by the text's CRC."""
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        vectors = np.stack([
+            np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(EMBEDDING_DIM).astype(np.float32)
+            for text in texts
+        ])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def get_sentence_embedding_dimension(self):
+        return EMBEDDING_DIM
+
+
+class StubTokenizer:
+    """Deterministic stand-in for the DistilBERT tokenizer: one CRC-hashed id per word, [CLS]/[SEP] around."""
+
+    def __call__(self, texts, truncation=True, max_length=512):
+        input_ids = [
+            ([1] + [2 + zlib.crc32(word.encode("utf-8")) % (ENCODER_VOCAB - 2) for word in text.split()] + [1])[:max_length]
+            for text in texts
+        ]
+        return {"input_ids": input_ids, "attention_mask": [[1] * len(ids) for ids in input_ids]}
+
+    def pad(self, features, return_tensors="pt"):
+        import torch
+        longest = max(len(ids) for ids in features["input_ids"])
+        return {
+            key: torch.tensor([row + [0] * (longest - len(row)) for row in rows])
+            for key, rows in features.items()
+        }
+
+
+class StubEncoder:
+    """Deterministic stand-in for the DistilBERT model: hidden states looked up from a fixed random table."""
+
+    def __init__(self):
+        import torch
+        self.table = torch.randn(ENCODER_VOCAB, ENCODER_DIM, generator=torch.Generator().manual_seed(0))
+
+    def __call__(self, input_ids, attention_mask):
+        return SimpleNamespace(last_hidden_state=self.table[input_ids])
+
+
+def stub_topic_index(labels: List[str]):
+    centroids = np.random.default_rng(0).standard_normal((len(labels), EMBEDDING_DIM)).astype(np.float32)
+    return TopicIndex(range(len(labels)), centroids, dict(enumerate(labels)), min_similarity=0.0)
+
+
+class StubPublisher:
+    """Offline IpfsPublisher: computes the CID locally, never touches the network."""
+
+    def start(self):
+        pass
+
+    def publish(self, name: str, doc: Dict) -> Dict:
+        return {"ipfs_hash": compute_cid(canonical_json(doc)), "ipfs_status": "pinned"}
+
+    def fetch(self, cid: str):
+        return None
+
+    def stats(self) -> Dict:
+        return {"spool_depth": 0, "failures": 0}
+
+
+def timed(fn: Callable, repeat: int) -> Dict:
+    fn()  # warm up lazy imports and code paths
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "repeat": repeat
+    }
+
+
+def import_pipeline(real_models: bool, workdir: str):
+    """Import main offline: lazy model loading, scratch state dirs, model caches off unless overridden."""
+    os.environ["MODEL_WARMUP"] = "lazy"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("ANALYSIS_CACHE_SIZE", "0")
+    os.environ["IPFS_SPOOL_DIR"] = os.path.join(workdir, "ipfs_spool")
+    os.environ["IPFS_INDEX_PATH"] = os.path.join(workdir, "ipfs_index.sqlite3")
+    os.environ["PROFILE_STATE_DIR"] = os.path.join(workdir, "profile_state")
+    import main
+
+    main.ipfs_publisher = StubPublisher()
+    if not real_models:
+        import analyze_personality
+        main.models.override("sentiment", StubSentiment())
+        main.models.override("embedding", StubEmbedder())
+        main.models.override("topic_index", stub_topic_index(list(main.keyword_engine.lexicon.get("topics", {}))))
+        # Tokenization, padding and pooling stay real; only the DistilBERT forward pass is stubbed
+        encoder = (StubTokenizer(), StubEncoder())
+        analyze_personality.get_encoder = lambda: encoder
+    return main
+
+
+def bench_dataset(main, tweets: List[Dict], repeat: int, client) -> Dict:
+    ctx = main.AnalysisContext
+    report = main.generate_personality_report("bench", tweets, ctx(tweets))
+    results = {
+        "score_big_five": timed(lambda: main.score_big_five(tweets, ctx(tweets)), repeat),
+        "analyze_topics": timed(lambda: main.analyze_topics(tweets, ctx(tweets)), repeat),
+        "analyze_posting_behavior": timed(lambda: main.analyze_posting_behavior(tweets, ctx(tweets)), repeat),
+        "generate_trivia_questions": timed(lambda: main.generate_trivia_questions("bench", report, tweets, ctx(tweets)), repeat)
+    }
+
+    import analyze_personality
+    cleaned = analyze_personality.preprocess_tweets(tweets)
+    results["extract_features"] = timed(lambda: analyze_personality.extract_features(cleaned), repeat)
+
+    if client is not None:
+        calls = itertools.count()
+        # A fresh username per call keeps the response cache out of the measurement
+        post = lambda username: client.post("/generatePersonalityAndQuestions", json={"username": username, "tweets": tweets})
+        response = post("bench-endpoint")
+        response.raise_for_status()
+        results["endpoint"] = timed(lambda: post(f"bench-{next(calls)}").raise_for_status(), repeat)
+        results["endpoint_cached"] = timed(lambda: post("bench-endpoint").raise_for_status(), repeat)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Benchmarks whose median got slower than the baseline by more than `threshold` (0.2 = 20%)."""
+    regressions = []
+    for dataset, benches in results["results"].items():
+        for name, current in benches.items():
+            previous = baseline.get("results", {}).get(dataset, {}).get(name)
+            if previous and current["median"] > previous["median"] * (1 + threshold):
+                change = current["median"] / previous["median"] - 1
+                regressions.append(f"{dataset}/{name}: {previous['median'] * 1000:.2f}ms -> {current['median'] * 1000:.2f}ms (+{change:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the personality and trivia pipeline offline.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="Synthetic tweets per user")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--real-models", action="store_true", help="Use the real models instead of deterministic stubs")
+    parser.add_argument("--no-endpoint", action="store_true", help="Skip the HTTP endpoint benchmarks")
+    parser.add_argument("--out", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before a benchmark counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        main = import_pipeline(args.real_models, workdir)
+        datasets = load_datasets(args.sizes)
+        client = None
+        if not args.no_endpoint:
+            from fastapi.testclient import TestClient
+            client = TestClient(main.app)
+            # Synthetic users are larger than the API's per-request limit
+            main.MAX_TWEETS_PER_USER = max(len(tweets) for tweets in datasets.values())
+
+        results = {
+            "meta": {
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "models": "real" if args.real_models else "stub",
+                "repeat": args.repeat
+            },
+            "results": {}
+        }
+        for name, tweets in datasets.items():
+            print(f"Benchmarking {name} ({len(tweets)} tweets)", file=sys.stderr)
+            results["results"][name] = bench_dataset(main, tweets, args.repeat, client)
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def content_key(model_id: str, text: str) -> str:
+    """Content address for a model output: sha256 over (model id, normalized text)."""
+    return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class SQLiteStore:
+    """On-disk cache tier so cached model outputs survive restarts.
+
+    The connection is opened on first use in each process, so a store built
+    before a fork (gunicorn --preload) is never shared with the workers.
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int = 500000):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """This process's connection; callers hold the lock."""
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self._connection().execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return MISSING
+        return pickle.loads(row[0])
+
+    def set_many(self, items: Dict[str, Any], ttl: float):
+        now = time.time()
+        rows = [(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now) for key, value in items.items()]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)", rows)
+            self._writes += len(rows)
+            if self._writes >= 1000:
+                self._prune(now)
+                self._writes = 0
+            conn.commit()
+
+    def _prune(self, now: float):
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class ContentCache:
+    """Size-bounded LRU with TTL, optionally backed by a SQLite tier.
+
+    Keys are content addresses from `content_key`, so identical tweets map to
+    the same entry regardless of which user or request sent them.
+
+    The second tier is any object with SQLiteStore's `get`/`set_many`; pass
+    one as `backend`, or a `disk_path` to get a SQLiteStore.
+    """
+
+    def __init__(self, name: str, max_entries: int = 50000, ttl_seconds: float = 86400.0, disk_path: Optional[str] = None,
+                 backend: Optional[Any] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = backend if backend is not None else (SQLiteStore(disk_path, name) if disk_path else None)
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not MISSING:
+                with self._lock:
+                    self._disk_hits += 1
+                    self._store(key, value, now)
+                return value
+        with self._lock:
+            self._misses += 1
+        return MISSING
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not MISSING:
+                found[key] = value
+        return found
+
+    def _store(self, key: str, value: Any, now: float):
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]):
+        if not items:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key, value in items.items():
+                self._store(key, value, now)
+        if self._disk is not None:
+            try:
+                self._disk.set_many(items, self.ttl)
+            except sqlite3.Error as e:
+                logger.warning(f"Cache {self.name}: disk write failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_rate": (self._hits + self._disk_hits) / lookups if lookups else 0.0
+            }
+
+
+def cached_map(cache: ContentCache, model_id: str, texts: List[str], compute) -> List[Any]:
+    """Look every text up in `cache` and run `compute` once over the distinct misses."""
+    keys = [content_key(model_id, text) for text in texts]
+    found = cache.get_many(dict.fromkeys(keys))
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    if missing:
+        computed = compute(list(missing.values()))
+        fresh = dict(zip(missing.keys(), computed))
+        cache.set_many(fresh)
+        found.update(fresh)
+    return [found[key] for key in keys]
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+from content_cache import ContentCache, cached_map
+from topic_index import EMBEDDING_MODEL_ID
+
+
+class EmbeddingService:
+    """One sentence-embedding pass shared by topics, avatar features and profile state.
+
+    Vectors live in a content-addressed ContentCache keyed by (model id,
+    normalized text), optionally backed by SQLite, so each tweet is encoded
+    once no matter which feature, request or process asks for it first.
+    """
+
+    def __init__(self, model_id: str, get_model: Callable[[], Any], store: ContentCache, batch_size: int = 32,
+                 observe: Optional[Callable[[int, float], None]] = None):
+        self.model_id = model_id
+        self.get_model = get_model
+        self.store = store
+        self.batch_size = batch_size
+        self._observe = observe
+        self._lock = threading.Lock()
+        self._encoded = 0
+
+    @property
+    def dimension(self) -> int:
+        return self.get_model().get_sentence_embedding_dimension()
+
+    def _encode(self, texts: List[str]) -> List[np.ndarray]:
+        started = time.perf_counter()
+        vectors = list(self.get_model().encode(texts, batch_size=self.batch_size, show_progress_bar=False))
+        if self._observe is not None:
+            self._observe(len(texts), time.perf_counter() - started)
+        with self._lock:
+            self._encoded += len(texts)
+        return vectors
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts) x dimension) matrix; only texts missing from the store reach the model."""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack(cached_map(self.store, self.model_id, texts, self._encode))
+
+    def stats(self):
+        with self._lock:
+            return {"model_id": self.model_id, "encoded": self._encoded, **self.store.stats()}
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_sentence_transformer(model_id: str = EMBEDDING_MODEL_ID):
+    """Process-wide SentenceTransformer per model id, so every embedding user shares one copy."""
+    with _models_lock:
+        if model_id not in _models:
+            from sentence_transformers import SentenceTransformer
+            _models[model_id] = SentenceTransformer(model_id)
+        return _models[model_id]
+
+
+def create_embedding_service(model_id: str = EMBEDDING_MODEL_ID) -> EmbeddingService:
+    """Service for offline tools; with ANALYSIS_CACHE_PATH set it shares the API server's vector store."""
+    store = ContentCache(
+        "embedding",
+        int(os.environ.get("ANALYSIS_CACHE_SIZE", "50000")),
+        float(os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", "604800")),
+        os.environ.get("ANALYSIS_CACHE_PATH")
+    )
+    return EmbeddingService(model_id, lambda: load_sentence_transformer(model_id), store)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def share_embedding_service(service: EmbeddingService):
+    """Make `service` the one every embedding user in this process goes through (main registers the API's)."""
+    global _shared
+    with _shared_lock:
+        _shared = service
+
+
+def shared_embedding_service() -> EmbeddingService:
+    """The process's shared service; offline tools that never import main get a standalone one."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = create_embedding_service()
+        return _shared
@@ -0,0 +1,162 @@
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "int8", "onnx")
+ONNX_EXPORT_DIR = os.environ.get("ONNX_EXPORT_DIR", "models/onnx")
+
+
+def _check_backend(backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend}; expected one of {', '.join(BACKENDS)}")
+
+
+def _quantize(model):
+    """Dynamic int8 quantization of every Linear layer; weights int8, activations quantized on the fly."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_onnx(class_name: str, model_id: str):
+    try:
+        import optimum.onnxruntime as ort
+    except ImportError as e:
+        raise RuntimeError("The onnx backend needs `pip install optimum[onnxruntime]`") from e
+    model_class = getattr(ort, class_name)
+    export_path = os.path.join(ONNX_EXPORT_DIR, re.sub(r"[^\w.-]", "_", model_id))
+    if os.path.exists(export_path):
+        return model_class.from_pretrained(export_path)
+    logger.info(f"Exporting {model_id} to ONNX at {export_path}")
+    model = model_class.from_pretrained(model_id, export=True)
+    model.save_pretrained(export_path)
+    return model
+
+
+def load_sentiment_pipeline(model_id: str, backend: str = "torch"):
+    """text-classification pipeline for `model_id` on the chosen backend."""
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    _check_backend(backend)
+    if backend == "torch":
+        return pipeline("text-classification", model=model_id)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    if backend == "int8":
+        model = _quantize(AutoModelForSequenceClassification.from_pretrained(model_id))
+    else:
+        model = _load_onnx("ORTModelForSequenceClassification", model_id)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer)
+
+
+def load_encoder(model_id: str, backend: str = "torch") -> Tuple:
+    """(tokenizer, model) pair whose model returns `last_hidden_state`, on the chosen backend."""
+    from transformers import AutoTokenizer, AutoModel
+
+    _check_backend(backend)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    if backend == "onnx":
+        return tokenizer, _load_onnx("ORTModelForFeatureExtraction", model_id)
+    model = AutoModel.from_pretrained(model_id)
+    model.eval()
+    if backend == "int8":
+        model = _quantize(model)
+    return tokenizer, model
+
+
+def _timed(fn, repeat: int):
+    result = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return result, (time.perf_counter() - started) / max(repeat, 1)
+
+
+def _mean_pool(tokenizer, model, texts: List[str]):
+    import torch
+    inputs = tokenizer(texts, return_tensors="pt", truncation=True, max_length=512, padding=True)
+    with torch.inference_mode():
+        hidden = model(**inputs).last_hidden_state
+    mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+    return ((hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)).numpy()
+
+
+def sentiment_parity(texts: List[str], backend: str, model_id: str, repeat: int = 3) -> Dict:
+    """Compare `backend` against fp32 torch on labels, tones, trait scores and latency."""
+    os.environ.setdefault("MODEL_WARMUP", "lazy")
+    from main import SENTIMENT_TO_TONE, keyword_engine, trait_scorer
+
+    baseline = load_sentiment_pipeline(model_id, "torch")
+    candidate = load_sentiment_pipeline(model_id, backend)
+    run = lambda pipe: pipe(texts, batch_size=8, truncation=True, max_length=512)
+    baseline_out, baseline_seconds = _timed(lambda: run(baseline), repeat)
+    candidate_out, candidate_seconds = _timed(lambda: run(candidate), repeat)
+    baseline_labels = [r["label"] for r in baseline_out]
+    candidate_labels = [r["label"] for r in candidate_out]
+
+    stars = lambda label: int(label.split()[0])
+    hits = keyword_engine.match_all([t.lower() for t in texts])
+    counts = keyword_engine.count(hits)
+    topics = [name for name in keyword_engine.lexicon.get("topics", {}) if counts[f"topics.{name}"]]
+    baseline_traits = trait_scorer.score(trait_scorer.feature_matrix(hits, baseline_labels), topics)
+    candidate_traits = trait_scorer.score(trait_scorer.feature_matrix(hits, candidate_labels), topics)
+
+    return {
+        "backend": backend,
+        "texts": len(texts),
+        "label_agreement": sum(a == b for a, b in zip(baseline_labels, candidate_labels)) / len(texts),
+        "tone_agreement": sum(SENTIMENT_TO_TONE[a] == SENTIMENT_TO_TONE[b] for a, b in zip(baseline_labels, candidate_labels)) / len(texts),
+        "mean_star_difference": sum(abs(stars(a) - stars(b)) for a, b in zip(baseline_labels, candidate_labels)) / len(texts),
+        "max_trait_drift": max(abs(baseline_traits[t] - candidate_traits[t]) for t in baseline_traits),
+        "baseline_seconds": baseline_seconds,
+        "candidate_seconds": candidate_seconds,
+        "speedup": baseline_seconds / candidate_seconds if candidate_seconds else None
+    }
+
+
+def encoder_parity(texts: List[str], backend: str, model_id: str, repeat: int = 3) -> Dict:
+    """Cosine similarity and latency of `backend` embeddings against fp32 torch."""
+    import numpy as np
+
+    baseline = load_encoder(model_id, "torch")
+    candidate = load_encoder(model_id, backend)
+    baseline_out, baseline_seconds = _timed(lambda: _mean_pool(*baseline, texts), repeat)
+    candidate_out, candidate_seconds = _timed(lambda: _mean_pool(*candidate, texts), repeat)
+    cosine = (baseline_out * candidate_out).sum(axis=1) / (
+        np.linalg.norm(baseline_out, axis=1) * np.linalg.norm(candidate_out, axis=1))
+    return {
+        "backend": backend,
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "baseline_seconds": baseline_seconds,
+        "candidate_seconds": candidate_seconds,
+        "speedup": baseline_seconds / candidate_seconds if candidate_seconds else None
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a quantized/ONNX backend against the fp32 torch models.")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "torch"], default="int8")
+    parser.add_argument("--tweets", nargs="+", default=["alex.base_tweets.json"], help="Tweet JSON files to compare on")
+    parser.add_argument("--sentiment-model", default="nlptown/bert-base-multilingual-uncased-sentiment")
+    parser.add_argument("--encoder-model", default="distilbert-base-uncased")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="Fail if sentiment label agreement is lower")
+    args = parser.parse_args()
+
+    texts = []
+    for path in args.tweets:
+        with open(path, "r") as f:
+            texts.extend(t["text"] for t in json.load(f))
+
+    report = {
+        "sentiment": sentiment_parity(texts, args.backend, args.sentiment_model, args.repeat),
+        "encoder": encoder_parity(texts, args.backend, args.encoder_model, args.repeat)
+    }
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report["sentiment"]["label_agreement"] >= args.min_agreement else 1)
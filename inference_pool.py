@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the pool already holds as much work as it is allowed to queue."""
+
+
+class InferencePool:
+    """Bounded executor for blocking model inference and IPFS work.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more wait
+    behind them; anything beyond that is rejected immediately so callers can
+    apply backpressure instead of piling up latency.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 2, max_queue: int = 16, timeout: float = 60.0):
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        else:
+            raise ValueError(f"Unknown inference pool kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._capacity = max_workers + max_queue
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._completed = 0
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self._capacity:
+                self._rejected += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _on_done(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def submit(self, fn: Callable, *args):
+        """Submit a job without waiting for it; raises QueueFullError when saturated."""
+        if not self._acquire():
+            raise QueueFullError(f"Inference queue full ({self._capacity} jobs)")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # The slot is only freed once the job really finishes, even if the caller timed out
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, fn: Callable, *args, timeout: float = None):
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            logger.warning(f"Inference job {getattr(fn, '__name__', fn)} timed out after {timeout or self.timeout}s")
+            raise
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self._in_flight - self.max_workers, 0)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - self.max_workers, 0),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
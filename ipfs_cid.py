@@ -0,0 +1,61 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+# Defaults of `ipfs add`: 256 KiB fixed-size chunks, dag-pb leaves, CIDv0
+CHUNK_SIZE = 262144
+UNIXFS_FILE = 2
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def canonical_json(doc: Dict) -> bytes:
+    """Stable serialization so identical documents always hash to the same CID."""
+    return json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _field_bytes(field: int, data: bytes) -> bytes:
+    return _varint((field << 3) | 2) + _varint(len(data)) + data
+
+
+def _base58(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b"\0"))
+    return BASE58_ALPHABET[0] * leading_zeros + encoded
+
+
+def compute_cid(data: bytes) -> Optional[str]:
+    """CIDv0 that `ipfs add` assigns to `data`, or None if it needs more than one chunk.
+
+    A single-chunk file is one dag-pb node wrapping a UnixFS File message, so
+    its CID is base58(sha2-256 multihash of that node). Larger files are
+    split into a DAG whose layout we don't reproduce; callers upload those.
+    """
+    if len(data) > CHUNK_SIZE:
+        return None
+    unixfs = _field_varint(1, UNIXFS_FILE)
+    if data:
+        unixfs += _field_bytes(2, data)
+    unixfs += _field_varint(3, len(data))
+    node = _field_bytes(1, unixfs)
+    multihash = b"\x12\x20" + hashlib.sha256(node).digest()
+    return _base58(multihash)
@@ -0,0 +1,293 @@
+import fcntl
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ipfs_cid import canonical_json, compute_cid
+
+logger = logging.getLogger(__name__)
+
+STATUS_PINNED = "pinned"
+STATUS_PENDING = "pending"
+
+
+def extract_hash(ipfs_result) -> str:
+    if isinstance(ipfs_result, str):
+        return ipfs_result
+    if hasattr(ipfs_result, "get") and ipfs_result.get("Hash"):
+        return ipfs_result["Hash"]
+    raise ValueError(f"Unexpected IPFS response: {ipfs_result}")
+
+
+class PinIndex:
+    """Local record of every CID we have published (or spooled), with its content.
+
+    Lets the publisher skip uploads of content that is already pinned and
+    serve its own documents without an IPFS round-trip. When the daemon's CID
+    for a document differs from the locally computed one (other chunking or
+    CID version), an alias maps the local CID to the daemon's.
+
+    Like SQLiteStore, the connection is opened on first use in each process.
+    """
+
+    def __init__(self, path: str = "ipfs_index.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """This process's connection; callers hold the lock."""
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pins (cid TEXT PRIMARY KEY, name TEXT NOT NULL, content BLOB NOT NULL, pinned INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS aliases (local_cid TEXT PRIMARY KEY, cid TEXT NOT NULL)")
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def lookup(self, local_cid: str) -> Optional[Tuple[str, str]]:
+        """(published CID, status) for a locally computed CID, or None if unknown.
+
+        Status is STATUS_PINNED once the daemon has pinned it, STATUS_PENDING while it is only spooled.
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT cid, pinned FROM pins WHERE cid = COALESCE((SELECT cid FROM aliases WHERE local_cid = ?), ?)",
+                (local_cid, local_cid)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], STATUS_PINNED if row[1] else STATUS_PENDING
+
+    def alias(self, local_cid: str, cid: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (local_cid, cid))
+            conn.commit()
+
+    def get(self, cid: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connection().execute("SELECT content FROM pins WHERE cid = ?", (cid,)).fetchone()
+        return row[0] if row else None
+
+    def record(self, cid: str, name: str, content: bytes, pinned: bool):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO pins VALUES (?, ?, ?, ?, ?) ON CONFLICT(cid) DO UPDATE SET pinned = MAX(pinned, excluded.pinned)",
+                (cid, name, content, int(pinned), time.time())
+            )
+            conn.commit()
+
+
+class IpfsPublisher:
+    """Publishes JSON documents to IPFS over a pool of persistent client sessions.
+
+    Documents that cannot be uploaded right away (or all documents, in
+    write-behind mode) go to a spool directory on disk. A background thread
+    drains the spool in batches, one `add` call per batch, retrying with
+    exponential backoff until the daemon accepts them, so nothing is lost
+    across restarts.
+
+    Documents are canonicalized and their CID computed locally first; content
+    already in the pin index is never sent over the wire again.
+
+    Call `start` in each serving process (after any fork) to drain documents
+    left in the spool by an earlier run. Processes sharing a spool take turns
+    through a lock file, so each document is uploaded once.
+    """
+
+    def __init__(self, api_addr: str = "/ip4/127.0.0.1/tcp/5001", pool_size: int = 4, spool_dir: str = "ipfs_spool",
+                 write_behind: bool = False, batch_size: int = 8, max_backoff: float = 300.0,
+                 index_path: str = "ipfs_index.sqlite3", connect: Optional[Callable] = None):
+        self.api_addr = api_addr
+        self.pool_size = pool_size
+        self.spool_dir = spool_dir
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self._connect = connect or self._default_connect
+        self._clients = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._published = 0
+        self._spooled = 0
+        self._failures = 0
+        self._deduplicated = 0
+        self.index = PinIndex(index_path)
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def start(self):
+        """Start this process's flusher if the spool holds documents."""
+        if self._spooled_files():
+            self._ensure_flusher()
+            self._wake.set()
+
+    def _default_connect(self):
+        import ipfshttpclient
+        return ipfshttpclient.connect(self.api_addr, session=True)
+
+    @contextmanager
+    def client(self, timeout: float = 30.0):
+        """Borrow a pooled client; a client that raised is closed instead of returned."""
+        try:
+            client = self._clients.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    client = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                client = self._clients.get(timeout=timeout)
+        try:
+            yield client
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            try:
+                client.close()
+            except Exception:
+                pass
+            raise
+        else:
+            self._clients.put(client)
+
+    def publish(self, name: str, doc: Dict) -> Dict:
+        """Upload `doc` as `name`; returns {"ipfs_hash", "ipfs_status"} for the response."""
+        data = canonical_json(doc)
+        cid = compute_cid(data)
+        known = self.index.lookup(cid) if cid is not None else None
+        if known is not None:
+            # Spooled copies stay pending until the flusher has pinned them
+            ipfs_hash, status = known
+            with self._lock:
+                self._deduplicated += 1
+            logger.info(f"{name} unchanged, already {status} as {ipfs_hash}")
+            return {"ipfs_hash": ipfs_hash, "ipfs_status": status}
+        if not self.write_behind:
+            try:
+                with self.client() as client:
+                    ipfs_hash = extract_hash(client.add_bytes(data))
+                self.index.record(ipfs_hash, name, data, pinned=True)
+                if cid is not None and ipfs_hash != cid:
+                    logger.warning(f"Local CID {cid} for {name} differs from daemon CID {ipfs_hash}")
+                    self.index.alias(cid, ipfs_hash)
+                with self._lock:
+                    self._published += 1
+                logger.info(f"Saved {name} to IPFS: {ipfs_hash}")
+                return {"ipfs_hash": ipfs_hash, "ipfs_status": STATUS_PINNED}
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                logger.warning(f"IPFS upload of {name} failed: {e}. Spooling for retry.")
+        if cid is not None:
+            self.index.record(cid, name, data, pinned=False)
+        self._spool(name, data)
+        return {"ipfs_hash": cid, "ipfs_status": STATUS_PENDING}
+
+    def fetch(self, cid: str) -> Optional[bytes]:
+        """Content for `cid` if this node published it, else None; arbitrary CIDs are never fetched from IPFS."""
+        return self.index.get(cid)
+
+    def _spool(self, name: str, data: bytes):
+        path = os.path.join(self.spool_dir, f"{time.time_ns()}_{name}")
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._spooled += 1
+        self._ensure_flusher()
+        self._wake.set()
+
+    def _spooled_files(self) -> List[str]:
+        return sorted(f for f in os.listdir(self.spool_dir) if not f.endswith(".tmp"))
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_forever, name="ipfs-flusher", daemon=True)
+                self._flusher.start()
+
+    def flush_once(self) -> int:
+        """Upload one batch from the spool; returns how many documents were pinned."""
+        with open(self.spool_dir.rstrip(os.sep) + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                pinned = self._flush_batch()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        with self._lock:
+            self._published += pinned
+        return pinned
+
+    def _flush_batch(self) -> int:
+        batch = self._spooled_files()[:self.batch_size]
+        if not batch:
+            return 0
+        paths = [os.path.join(self.spool_dir, f) for f in batch]
+        with self.client() as client:
+            results = client.add(*paths)
+        if not isinstance(results, list):
+            results = [results]
+        hashes = {result["Name"]: extract_hash(result) for result in results}
+        pinned = 0
+        for filename, path in zip(batch, paths):
+            if filename in hashes:
+                logger.info(f"Pinned spooled {filename} to IPFS: {hashes[filename]}")
+                with open(path, "rb") as f:
+                    data = f.read()
+                self.index.record(hashes[filename], filename.split("_", 1)[1], data, pinned=True)
+                cid = compute_cid(data)
+                if cid is not None and cid != hashes[filename]:
+                    self.index.alias(cid, hashes[filename])
+                os.remove(path)
+                pinned += 1
+        return pinned
+
+    def _flush_forever(self):
+        backoff = 1.0
+        while True:
+            try:
+                if self.flush_once():
+                    backoff = 1.0
+                    continue
+                self._wake.wait()
+                self._wake.clear()
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                logger.warning(f"IPFS spool flush failed: {e}. Retrying in {backoff:.0f}s.")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "write_behind": self.write_behind,
+                "pool_size": self.pool_size,
+                "open_clients": self._created,
+                "published": self._published,
+                "deduplicated": self._deduplicated,
+                "spooled": self._spooled,
+                "spool_depth": len(self._spooled_files()),
+                "failures": self._failures
+            }
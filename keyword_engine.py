@@ -0,0 +1,100 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List
+
+import numpy as np
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyword_lexicon.json")
+
+
+def _term_pattern(term: str) -> str:
+    # A trailing "*" turns a whole-word term into a prefix match ("vibe*" -> vibe, vibes, vibing)
+    if term.endswith("*"):
+        return re.escape(term[:-1]) + r"\w*"
+    return re.escape(term)
+
+
+class KeywordEngine:
+    """Whole-word keyword matcher for every lexicon category at once.
+
+    The lexicon maps group -> category -> terms, e.g.
+    {"traits": {"Openness": ["innovat*", "web3"]}}. All terms compile into a
+    single regex, so each tweet is scanned once and reports the full set of
+    categories ("traits.Openness", "topics.Web3", ...) it hits.
+    """
+
+    def __init__(self, lexicon: Dict[str, Dict[str, List[str]]]):
+        self.lexicon = lexicon
+        self.categories = [f"{group}.{name}" for group, entries in lexicon.items() for name in entries]
+        self._term_patterns = []
+        for group, entries in lexicon.items():
+            for name, terms in entries.items():
+                for term in terms:
+                    self._term_patterns.append((re.compile(_term_pattern(term.lower()) + r"\Z"), f"{group}.{name}"))
+        alternatives = sorted({_term_pattern(term.lower()) for entries in lexicon.values() for terms in entries.values() for term in terms},
+                              key=len, reverse=True)
+        self._regex = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b") if alternatives else None
+        self._word_categories = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_LEXICON_PATH) -> "KeywordEngine":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def _categories_for(self, word: str) -> FrozenSet[str]:
+        categories = self._word_categories.get(word)
+        if categories is None:
+            categories = frozenset(category for pattern, category in self._term_patterns if pattern.match(word))
+            with self._lock:
+                self._word_categories[word] = categories
+        return categories
+
+    def match(self, lowered_text: str) -> FrozenSet[str]:
+        """Categories hit by one already-lowercased text."""
+        if self._regex is None:
+            return frozenset()
+        hits = set()
+        for word in self._regex.findall(lowered_text):
+            hits |= self._categories_for(word)
+        return frozenset(hits)
+
+    def match_all(self, lowered_texts: Iterable[str]) -> List[FrozenSet[str]]:
+        return [self.match(text) for text in lowered_texts]
+
+    def match_buffer(self, lowered_buffer: str, offsets: np.ndarray) -> List[FrozenSet[str]]:
+        """Like match_all, over texts joined into one buffer by a non-word separator.
+
+        `offsets[i]` is where text i starts and `offsets[-1]` is past the end
+        (TweetBatch.lowered / lowered_offsets). The regex scans the buffer once
+        and each match is mapped back to its text with searchsorted.
+        """
+        count = len(offsets) - 1
+        if self._regex is None or not count:
+            return [frozenset()] * count
+        starts = []
+        words = []
+        for m in self._regex.finditer(lowered_buffer):
+            starts.append(m.start())
+            words.append(m.group())
+        hits = [None] * count
+        for owner, word in zip((np.searchsorted(offsets, starts, side="right") - 1).tolist(), words):
+            categories = self._categories_for(word)
+            hits[owner] = categories if hits[owner] is None else hits[owner] | categories
+        empty = frozenset()
+        return [categories or empty for categories in hits]
+
+    @staticmethod
+    def count(hits: Iterable[FrozenSet[str]]) -> Counter:
+        """Number of texts hitting each category."""
+        counts = Counter()
+        for categories in hits:
+            counts.update(categories)
+        return counts
+
+
+def load_keyword_engine() -> KeywordEngine:
+    return KeywordEngine.from_file(os.environ.get("KEYWORD_LEXICON_PATH", DEFAULT_LEXICON_PATH))
@@ -1,13 +1,14 @@
-import json
+import sys
+
+from tweet_stream import stream_tweets
 
 def load_tweets(username):
     try:
-        with open(f"{username}_tweets.json", "r") as f:
-            tweets = json.load(f)
-        print(f"Loaded {len(tweets)} tweets for {username}")
+        tweets = list(stream_tweets(username))
+        print(f"Loaded {len(tweets)} tweets for {username}", file=sys.stderr)
         return tweets
     except Exception as e:
-        print(f"Error loading tweets: {e}")
+        print(f"Error loading tweets: {e}", file=sys.stderr)
         return []
 
 if __name__ == "__main__":
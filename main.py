@@ -1,42 +1,115 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import ipfshttpclient
+import asyncio
+import hashlib
 import json
-from transformers import pipeline
-from bertopic import BERTopic
-import datetime
-from typing import List, Dict
+import os
+import numpy as np
+from functools import cached_property
+from typing import List, Dict, Iterator, Optional, Tuple
 import random
-from trivia_templates import QUESTION_TEMPLATES
+import time
+from trivia_templates import TriviaFacts, CompiledTemplate, select_variants, variant_rng
+from inference_pool import InferencePool, QueueFullError
+from sentiment_batcher import SentimentBatcher
+from content_cache import ContentCache, cached_map
+from embedding_service import EmbeddingService, load_sentence_transformer, share_embedding_service
+from response_cache import ResponseCache, request_key
+from topic_index import TopicIndex
+from model_registry import ModelRegistry
+from inference_backends import load_sentiment_pipeline
+from ipfs_publisher import IpfsPublisher
+from ipfs_cid import canonical_json
+from keyword_engine import KeywordEngine, load_keyword_engine
+from trait_scoring import load_trait_scorer, pad_batch
+from profile_state import ProfileState, ProfileStore, tweet_key
+from temporal_features import TemporalFeatures, check_timezone
+from tweet_batch import DEFAULT_CREATED_AT, TweetBatch, Tweets, as_batch
+from metrics import SIZE_BUCKETS, registry as metrics_registry, span, stat_samples
 
 
 import logging
 logger = logging.getLogger(__name__)
 
-sentiment_analyzer = None
-topic_model = None
+SENTIMENT_MODEL_ID = "nlptown/bert-base-multilingual-uncased-sentiment"
+EMBEDDING_MODEL_ID = "all-MiniLM-L6-v2"
+# Fitted offline with `python topic_index.py <corpus.json ...>`
+TOPIC_INDEX_PATH = os.environ.get("TOPIC_INDEX_PATH", "models/topic_index")
 
-def init_models():
-    global sentiment_analyzer, topic_model
-    try:
-        sentiment_analyzer = pipeline("text-classification", model="nlptown/bert-base-multilingual-uncased-sentiment")
-        topic_model = BERTopic(min_topic_size=2, embedding_model="all-MiniLM-L6-v2")
-        logger.info("NLP models initialized successfully.")
-    except Exception as e:
-        logger.error(f"Failed to initialize NLP models: {e}")
-        raise
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "eager")
+# torch (fp32), int8 (dynamic quantization) or onnx (ONNX Runtime); check with `python inference_backends.py`
+SENTIMENT_BACKEND = os.environ.get("SENTIMENT_BACKEND", "torch")
+
+def load_sentiment_analyzer():
+    return load_sentiment_pipeline(SENTIMENT_MODEL_ID, SENTIMENT_BACKEND)
 
-init_models()
+def load_embedding_model():
+    return load_sentence_transformer(EMBEDDING_MODEL_ID)
 
-# Set random seed for reproducible nickname/motto during testing
-random.seed(42)
+def load_topic_index() -> Optional[TopicIndex]:
+    if not os.path.exists(TOPIC_INDEX_PATH):
+        logger.warning(f"No topic index at {TOPIC_INDEX_PATH}; using keyword-based topics.")
+        return None
+    topic_index = TopicIndex.load(TOPIC_INDEX_PATH)
+    logger.info(f"Loaded topic index with {len(topic_index.topic_ids)} topics from {TOPIC_INDEX_PATH}")
+    return topic_index
+
+# Every model is loaded once, through the registry
+models = ModelRegistry()
+models.register("sentiment", load_sentiment_analyzer)
+models.register("embedding", load_embedding_model)
+models.register("topic_index", load_topic_index)
 
 # Setup logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# Share of tweets whose text and sentiment are logged when LOG_LEVEL=DEBUG
+TWEET_LOG_SAMPLE_RATE = float(os.environ.get("TWEET_LOG_SAMPLE_RATE", "1.0"))
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+REQUEST_SECONDS = metrics_registry.histogram(
+    "friendchain_request_seconds", "End-to-end latency of generation requests", labelnames=("endpoint",))
+MODEL_BATCH_SIZE = metrics_registry.histogram(
+    "friendchain_model_batch_size", "Texts per model forward pass", labelnames=("model",), buckets=SIZE_BUCKETS)
+MODEL_BATCH_SECONDS = metrics_registry.histogram(
+    "friendchain_model_batch_seconds", "Duration of one model forward pass", labelnames=("model",))
+
+# "eager" loads at import, so a pre-forking server (gunicorn --preload) shares the
+# weights copy-on-write across workers; "background" loads after startup; "lazy" on first use
+if MODEL_WARMUP == "eager":
+    models.warmup()
+
 app = FastAPI()
 
+# Blocking inference and IPFS work runs here so the event loop stays responsive
+INFERENCE_POOL_KIND = os.environ.get("INFERENCE_POOL_KIND", "thread")
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", "16"))
+INFERENCE_TIMEOUT_SECONDS = float(os.environ.get("INFERENCE_TIMEOUT_SECONDS", "60"))
+RETRY_AFTER_SECONDS = int(os.environ.get("RETRY_AFTER_SECONDS", "5"))
+
+inference_pool = InferencePool(
+    kind=INFERENCE_POOL_KIND,
+    max_workers=INFERENCE_WORKERS,
+    max_queue=INFERENCE_QUEUE_SIZE,
+    timeout=INFERENCE_TIMEOUT_SECONDS
+)
+
+@app.on_event("startup")
+def start_model_warmup():
+    if MODEL_WARMUP == "background":
+        models.warmup_in_background()
+
+@app.on_event("startup")
+def start_ipfs_flusher():
+    # Runs in each worker, after gunicorn --preload has forked it
+    ipfs_publisher.start()
+
+@app.on_event("shutdown")
+def shutdown_inference_pool():
+    inference_pool.shutdown(wait=False)
+
 # Pydantic models
 class Tweet(BaseModel):
     text: str
@@ -46,21 +119,91 @@ class GenerateRequest(BaseModel):
     username: str
     tweets: List[Tweet]
 
-# Initialize NLP models
-try:
-    sentiment_analyzer = pipeline("text-classification", model="nlptown/bert-base-multilingual-uncased-sentiment")
-    logger.info("Sentiment analyzer loaded successfully.")
-except Exception as e:
-    logger.error(f"Failed to load sentiment analyzer: {e}")
-    raise
-
-# IPFS client (deferred to Phase 3 for full fix)
-try:
-    ipfs_client = ipfshttpclient.connect('/ip4/127.0.0.1/tcp/5001')
-    logger.info("IPFS client connected successfully.")
-except Exception as e:
-    logger.warning(f"IPFS connection failed: {e}. Using local storage fallback.")
-    ipfs_client = None
+class BatchRequest(BaseModel):
+    users: List[GenerateRequest]
+
+MAX_TWEETS_PER_USER = 50
+# Upper bound on ?variants=N, the number of distinct trivia games returned per request
+MAX_TRIVIA_VARIANTS = int(os.environ.get("MAX_TRIVIA_VARIANTS", "10"))
+MAX_BATCH_USERS = int(os.environ.get("MAX_BATCH_USERS", "100"))
+
+# Concurrent requests share sentiment forward passes through the batcher
+SENTIMENT_BATCHING = os.environ.get("SENTIMENT_BATCHING", "1") != "0"
+SENTIMENT_MAX_BATCH_SIZE = int(os.environ.get("SENTIMENT_MAX_BATCH_SIZE", "64"))
+SENTIMENT_MAX_WAIT_MS = float(os.environ.get("SENTIMENT_MAX_WAIT_MS", "5"))
+
+def run_sentiment_pipeline(texts: List[str], **kwargs) -> List[Dict]:
+    started = time.perf_counter()
+    results = models.get("sentiment")(texts, **kwargs)
+    MODEL_BATCH_SECONDS.observe(time.perf_counter() - started, model="sentiment")
+    MODEL_BATCH_SIZE.observe(len(texts), model="sentiment")
+    return results
+
+sentiment_batcher = SentimentBatcher(
+    run_sentiment_pipeline,
+    max_batch_size=SENTIMENT_MAX_BATCH_SIZE,
+    max_wait_ms=SENTIMENT_MAX_WAIT_MS,
+    truncation=True,
+    max_length=512
+)
+
+# Model outputs are cached by content hash, so repeated tweets skip inference
+ANALYSIS_CACHE_SIZE = int(os.environ.get("ANALYSIS_CACHE_SIZE", "50000"))
+ANALYSIS_CACHE_TTL_SECONDS = float(os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", "604800"))
+ANALYSIS_CACHE_PATH = os.environ.get("ANALYSIS_CACHE_PATH")
+
+sentiment_cache = ContentCache("sentiment", ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_PATH)
+embedding_cache = ContentCache("embedding", ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_PATH)
+
+# Whole responses are cached by canonical request hash, so client retries and re-submits are free
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH")
+
+response_cache = ResponseCache(ContentCache("responses", RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_PATH))
+
+def _run_sentiment(texts: List[str]) -> List[Dict]:
+    if SENTIMENT_BATCHING:
+        return sentiment_batcher.analyze(texts)
+    return run_sentiment_pipeline(texts, batch_size=8, truncation=True, max_length=512)
+
+def analyze_sentiment(texts: List[str]) -> List[Dict]:
+    if not texts:
+        return []
+    with span("sentiment"):
+        # Backends may disagree on borderline labels, so each caches separately
+        return cached_map(sentiment_cache, f"{SENTIMENT_MODEL_ID}:{SENTIMENT_BACKEND}", texts, _run_sentiment)
+
+def _observe_embedding_batch(size: int, seconds: float):
+    MODEL_BATCH_SECONDS.observe(seconds, model="embedding")
+    MODEL_BATCH_SIZE.observe(size, model="embedding")
+
+# Every consumer of sentence embeddings (topics, profile state, avatar features) reads them from this one store
+embedding_service = EmbeddingService(EMBEDDING_MODEL_ID, lambda: models.get("embedding"), embedding_cache,
+                                     observe=_observe_embedding_batch)
+share_embedding_service(embedding_service)
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    with span("embedding"):
+        return embedding_service.embed(texts)
+
+# IPFS uploads go through a pooled publisher that spools failed (or write-behind) uploads to disk
+IPFS_API_ADDR = os.environ.get("IPFS_API_ADDR", "/ip4/127.0.0.1/tcp/5001")
+IPFS_WRITE_BEHIND = os.environ.get("IPFS_WRITE_BEHIND", "0") == "1"
+
+ipfs_publisher = IpfsPublisher(
+    api_addr=IPFS_API_ADDR,
+    pool_size=int(os.environ.get("IPFS_POOL_SIZE", "4")),
+    spool_dir=os.environ.get("IPFS_SPOOL_DIR", "ipfs_spool"),
+    write_behind=IPFS_WRITE_BEHIND,
+    batch_size=int(os.environ.get("IPFS_BATCH_SIZE", "8")),
+    max_backoff=float(os.environ.get("IPFS_MAX_BACKOFF_SECONDS", "300")),
+    index_path=os.environ.get("IPFS_INDEX_PATH", "ipfs_index.sqlite3")
+)
+
+def publish_document(name: str, doc: Dict) -> Dict:
+    with span("ipfs"):
+        return ipfs_publisher.publish(name, doc)
 
 SENTIMENT_TO_TONE = {
     "1 star": "deep",
@@ -70,172 +213,192 @@ SENTIMENT_TO_TONE = {
     "5 stars": "happy"
 }
 
-def score_big_five(tweets: List[Dict]) -> Dict[str, float]:
-    openness = 50.0
-    conscientiousness = 50.0
-    extraversion = 50.0
-    agreeableness = 50.0
-    neuroticism = 50.0
-    tweet_count = len(tweets)
-    
+# Hours, weekdays and active days for Posting Habits are counted in this zone (IANA name or ±HH:MM)
+POSTING_TIMEZONE = check_timezone(os.environ.get("POSTING_TIMEZONE", "UTC"))
+
+# Trait, topic and style keywords live in keyword_lexicon.json
+keyword_engine = load_keyword_engine()
+# Rule weights for the Big Five live in trait_weights.json
+trait_scorer = load_trait_scorer(keyword_engine.categories)
+
+class AnalysisContext:
+    """Per-request analysis state shared by every scorer and the trivia builder.
+
+    Each derived value is computed on first access and then reused, so a single
+    request runs the sentiment model and topic analysis exactly once.
+    """
+
+    def __init__(self, tweets: Tweets):
+        self.tweets = as_batch(tweets, DEFAULT_CREATED_AT)
+
+    @cached_property
+    def texts(self) -> List[str]:
+        return self.tweets.texts()
+
+    @cached_property
+    def content_digest(self) -> str:
+        """Hash of the tweet set; seeds the per-request RNG so equal input gives equal output."""
+        return hashlib.sha256(canonical_json([list(pair) for pair in zip(self.texts, self.tweets.created_at)])).hexdigest()
+
+    @cached_property
+    def keyword_hits(self) -> List[frozenset]:
+        # One regex pass over the batch's lowercased buffer
+        return keyword_engine.match_buffer(self.tweets.lowered, self.tweets.lowered_offsets)
+
+    @cached_property
+    def keyword_counts(self) -> Dict[str, int]:
+        return KeywordEngine.count(self.keyword_hits)
+
+    @cached_property
+    def trait_features(self) -> np.ndarray:
+        return trait_scorer.feature_matrix(self.keyword_hits, [s["label"] for s in self.sentiments])
+
+    @cached_property
+    def is_meme(self) -> np.ndarray:
+        return self.tweets.contains("#") | np.array(["style.Meme" in hits for hits in self.keyword_hits], dtype=bool)
+
+    @cached_property
+    def is_thread(self) -> np.ndarray:
+        return self.tweets.lengths > 100
+
+    @cached_property
+    def temporal(self) -> TemporalFeatures:
+        """Every created_at parsed once into one epoch-seconds array."""
+        with span("parse"):
+            return TemporalFeatures(self.tweets.timestamps, POSTING_TIMEZONE)
+
+    @cached_property
+    def sentiments(self) -> List[Dict]:
+        return analyze_sentiment(self.texts)
+
+    @cached_property
+    def embeddings(self) -> np.ndarray:
+        return embed_texts(self.texts)
+
+    @cached_property
+    def topic_ids(self) -> Optional[np.ndarray]:
+        topic_index = models.get("topic_index")
+        if topic_index is None:
+            return None
+        return topic_index.assign(self.embeddings)[0]
+
+    @cached_property
+    def topics(self) -> List[str]:
+        return analyze_topics(self.tweets, self)
+
+    @cached_property
+    def big5(self) -> Dict[str, float]:
+        # One row per tweet: keyword categories + one-hot sentiment, scored with the trait weight matrix
+        return trait_scorer.score(self.trait_features, self.topics)
+
+    def prime(self, sentiments: Optional[List[Dict]] = None, embeddings: Optional[np.ndarray] = None,
+              big5: Optional[Dict[str, float]] = None):
+        """Seed model outputs computed elsewhere, e.g. in a pooled pass over many users."""
+        if sentiments is not None:
+            self.__dict__["sentiments"] = sentiments
+        if embeddings is not None:
+            self.__dict__["embeddings"] = embeddings
+        if big5 is not None:
+            self.__dict__["big5"] = big5
+
+def score_big_five(tweets: Tweets, ctx: Optional[AnalysisContext] = None) -> Dict[str, float]:
     if not tweets:
-        return {
-            "Openness": openness,
-            "Conscientiousness": conscientiousness,
-            "Extraversion": extraversion,
-            "Agreeableness": agreeableness,
-            "Neuroticism": neuroticism
-        }
+        return {trait: trait_scorer.base for trait in trait_scorer.traits}
 
-    topics = analyze_topics(tweets)
-    logger.info(f"Topics detected: {topics}")
-    
-    # Batch sentiment analysis
-    texts = [tweet.get("text", "") for tweet in tweets if tweet.get("text", "")]
-    sentiments = sentiment_analyzer([t["text"] for t in tweets], batch_size=8, truncation=True, max_length=512)
-    
-    # Normalize scores by % of tweets
-    openness_tweets = sum(1 for t in tweets if any(w in t.get("text", "").lower() for w in ["innovate", "create", "tech", "hackathon", "web3", "blockchain"]))
-    conscientiousness_tweets = sum(1 for t in tweets if any(w in t.get("text", "").lower() for w in ["work", "project", "deadline", "plan", "coding", "session", "model", "bert"]))
-    extraversion_tweets = sum(1 for t in tweets if any(w in t.get("text", "").lower() for w in ["party", "meetup", "vibe", "friends"]))
-    agreeableness_tweets = sum(1 for t, s in zip(tweets, sentiments) if s["label"] in ["4 stars", "5 stars"] or "thanks" in t.get("text", "").lower())
-    neuroticism_tweets = sum(1 for t, s in zip(tweets, sentiments) if s["label"] in ["1 star", "2 stars"])
-
-    openness_boost = 20 * (openness_tweets / tweet_count)
-    conscientiousness_boost = 20 * (conscientiousness_tweets / tweet_count)
-    extraversion_boost = 20 * (extraversion_tweets / tweet_count)
-    agreeableness_boost = 20 * (agreeableness_tweets / tweet_count)
-    neuroticism_boost = 20 * (neuroticism_tweets / tweet_count)
-
-    openness += openness_boost
-    conscientiousness += conscientiousness_boost
-    extraversion += extraversion_boost
-    agreeableness += agreeableness_boost
-    neuroticism += neuroticism_boost
-
-    # Explicit topic-based adjustments
-    web3_count = sum(1 for t in tweets if "web3" in t.get("text", "").lower())
-    ai_count = sum(1 for t in tweets if any(w in t.get("text", "").lower() for w in ["ai", "bert", "model"]))
-    web3_boost = 0
-    ai_boost = 0
-    if "Web3" in topics:
-        web3_boost = 20 * (web3_count / tweet_count)
-        openness += web3_boost
-        logger.info(f"Web3 boost applied: {web3_count}/{tweet_count} = {web3_boost}")
-    if "AI" in topics:
-        ai_boost = 10 * (ai_count / tweet_count)
-        conscientiousness += ai_boost
-        logger.info(f"AI boost applied: {ai_count}/{tweet_count} = {ai_boost}")
-
-    # Log all boosts
-    logger.info(f"Openness: Base=50, Keyword={openness_boost}, Web3={web3_boost}, Total={openness}")
-    logger.info(f"Conscientiousness: Base=50, Keyword={conscientiousness_boost}, AI={ai_boost}, Total={conscientiousness}")
-
-    # Log sentiment for debugging
-    for tweet, sentiment in zip(tweets, sentiments):
-        text = tweet.get("text", "")
-        sentiment_label = sentiment["label"] if text else "3 stars"
-        logger.info(f"Tweet: {text[:50]}... Sentiment: {sentiment_label}")
+    ctx = ctx or AnalysisContext(tweets)
+    logger.info(f"Topics detected: {ctx.topics}")
+    big5 = ctx.big5
+    logger.info(f"Big Five scores: {big5}")
 
-    return {
-        "Openness": min(max(openness, 0), 100),
-        "Conscientiousness": min(max(conscientiousness, 0), 100),
-        "Extraversion": min(max(extraversion, 0), 100),
-        "Agreeableness": min(max(agreeableness, 0), 100),
-        "Neuroticism": min(max(neuroticism, 0), 100)
-    }
+    # Per-tweet sentiment only at DEBUG, sampled, to keep logging I/O off the hot path
+    if logger.isEnabledFor(logging.DEBUG):
+        for text, sentiment in zip(ctx.texts, ctx.sentiments):
+            if random.random() < TWEET_LOG_SAMPLE_RATE:
+                sentiment_label = sentiment["label"] if text else "3 stars"
+                logger.debug(f"Tweet: {text[:50]}... Sentiment: {sentiment_label}")
 
-def analyze_posting_behavior(tweets: List[Dict]) -> str:
+    return big5
+
+# Report wording for the Posting Habits peak period, so the report and the "most likely to tweet" answer agree
+POSTING_STYLES = {"Morning": "Morning tweeter", "Afternoon": "Afternoon tweeter", "Evening": "Night tweeter", "3am": "Night tweeter"}
+
+def posting_style_from_habits(habits: Dict, tweet_count: int) -> str:
+    if not tweet_count:
+        return "Casual tweeter"
+    return POSTING_STYLES[habits["peak_period"]]
+
+def analyze_posting_behavior(tweets: Tweets, ctx: Optional[AnalysisContext] = None) -> str:
+    ctx = ctx or AnalysisContext(tweets)
     try:
-        sorted_tweets = sorted(tweets, key=lambda t: t.get("created_at", "2025-01-01T00:00:00Z"), reverse=True)
-        hours = [datetime.datetime.fromisoformat(t.get("created_at", "2025-01-01T00:00:00Z").replace("Z", "+00:00")).hour for t in sorted_tweets]
-        if not hours:
-            return "Casual tweeter"
-        bins = {"Morning": 0, "Afternoon": 0, "Night": 0}
-        for h in hours:
-            if 6 <= h < 12:
-                bins["Morning"] += 1
-            elif 12 <= h < 18:
-                bins["Afternoon"] += 1
-            else:
-                bins["Night"] += 1
-        if bins["Night"] > 0:
-            max_bin = "Night"
-        else:
-            max_bin = max(bins, key=bins.get)
-        logger.info(f"Posting bins: {bins}")
-        return f"{max_bin} tweeter"
+        return posting_style_from_habits(ctx.temporal.habits(), len(ctx.temporal))
     except Exception as e:
         logger.warning(f"Posting behavior analysis failed: {e}")
         return "Casual tweeter"
 
-def analyze_writing_style(tweets: List[Dict]) -> str:
-    meme_count = sum(1 for tweet in tweets if "#" in tweet.get("text", "") or "lol" in tweet.get("text", "").lower())
-    thread_count = sum(1 for tweet in tweets if len(tweet.get("text", "")) > 100)
-    if meme_count > len(tweets) / 2:
+def writing_style_from_counts(meme_count: int, thread_count: int, tweet_count: int) -> str:
+    if meme_count > tweet_count / 2:
         return "Meme lord"
-    elif thread_count > len(tweets) / 2:
+    elif thread_count > tweet_count / 2:
         return "Thread master"
     return "Casual tweeter"
 
-def keyword_based_topics(tweets: List[Dict]) -> List[str]:
-    topic_counts = {"Web3": 0, "AI": 0, "Social": 0}
-    for tweet in tweets:
-        text = tweet.get("text", "").lower()
-        if any(word in text for word in ["web3", "blockchain", "hackathon"]):
-            topic_counts["Web3"] += 1
-        if any(word in text for word in ["ai", "bert", "model"]):
-            topic_counts["AI"] += 1
-        if any(word in text for word in ["party", "friends", "vibe", "crew"]):
-            topic_counts["Social"] += 1
+def analyze_writing_style(tweets: Tweets, ctx: Optional[AnalysisContext] = None) -> str:
+    ctx = ctx or AnalysisContext(tweets)
+    return writing_style_from_counts(sum(ctx.is_meme), sum(ctx.is_thread), len(tweets))
+
+def topics_from_keyword_counts(keyword_counts: Dict[str, int]) -> List[str]:
+    topic_counts = {name: keyword_counts.get(f"topics.{name}", 0) for name in keyword_engine.lexicon.get("topics", {})}
     topics = [topic for topic, count in sorted(topic_counts.items(), key=lambda x: x[1], reverse=True) if count > 0]
     logger.debug(f"Keyword-based topics: {topics}")
     return topics or ["General"]
 
-def analyze_topics(tweets: List[Dict]) -> List[str]:
-    texts = [tweet.get("text", "") for tweet in tweets]
-    if len(tweets) >= 5:
-        docs = [t["text"] for t in tweets]
-        topics, _ = topic_model.fit_transform(docs)
-        topic_info = topic_model.get_topic_info()
-        topic_labels = [topic_info[topic_info["Topic"] == t]["Name"].iloc[0] for t in topics if t != -1]
-        return topic_labels[:3] if topic_labels else ["General"]
-    else:
-        return keyword_based_topics(tweets)
+def keyword_based_topics(tweets: Tweets, ctx: Optional[AnalysisContext] = None) -> List[str]:
+    ctx = ctx or AnalysisContext(tweets)
+    return topics_from_keyword_counts(ctx.keyword_counts)
+
+MIN_TWEETS_FOR_TOPIC_INDEX = 5
+
+def uses_topic_index(tweet_count: int) -> bool:
+    return tweet_count >= MIN_TWEETS_FOR_TOPIC_INDEX and models.get("topic_index") is not None
+
+def analyze_topics(tweets: Tweets, ctx: Optional[AnalysisContext] = None) -> List[str]:
+    ctx = ctx or AnalysisContext(tweets)
+    with span("topics"):
+        return _analyze_topics(tweets, ctx)
+
+def _analyze_topics(tweets: Tweets, ctx: AnalysisContext) -> List[str]:
+    if not uses_topic_index(len(tweets)):
+        return keyword_based_topics(tweets, ctx)
     try:
-        topic_model = BERTopic(min_topic_size=2, embedding_model="all-MiniLM-L6-v2")
-        topics, _ = topic_model.fit_transform(texts)
-        topic_info = topic_model.get_topic_info()
-        topic_names = [row["Name"] for row in topic_info.to_dict("records") if row["Topic"] != -1]
-        if any("web3" in name.lower() or "blockchain" in name.lower() for name in topic_names):
-            logger.info(f"BERTopic detected topics: {topic_names}")
-            return ["Web3"] + [name for name in topic_names if "web3" not in name.lower()]
-        logger.info(f"BERTopic detected topics: {topic_names}")
-        return topic_names or ["General"]
+        topic_labels = models.get("topic_index").rank_labels(ctx.topic_ids, limit=3)
+        logger.debug(f"Topic index labels: {topic_labels}")
+        return topic_labels or ["General"]
     except Exception as e:
-        logger.warning(f"BERTopic failed: {e}. Falling back to keyword-based.")
-        return keyword_based_topics(tweets)
+        logger.warning(f"Topic index lookup failed: {e}. Falling back to keyword-based.")
+        return keyword_based_topics(tweets, ctx)
 
-def generate_personality_report(username: str, tweets: List[Dict]) -> Dict:
+def generate_personality_report(username: str, tweets: Tweets, ctx: Optional[AnalysisContext] = None) -> Dict:
     logger.debug(f"Generating personality report for {username}")
-    big5 = score_big_five(tweets)
-    posting_style = analyze_posting_behavior(tweets)
-    writing_style = analyze_writing_style(tweets)
-    topics = analyze_topics(tweets)
-
-    random.seed(42)
-    nickname = "The " + random.choice(["Wild", "Cosmic", "Tech"]) + " " + random.choice(["Trailblazer", "Philosopher", "VibeMaster"])
-    motto = random.choice([
+    ctx = ctx or AnalysisContext(tweets)
+    with span("scoring"):
+        big5 = score_big_five(tweets, ctx)
+        posting_style = analyze_posting_behavior(tweets, ctx)
+        writing_style = analyze_writing_style(tweets, ctx)
+        return build_personality_report(username, big5, posting_style, writing_style, variant_rng(username, ctx.content_digest, "report"))
+
+def build_personality_report(username: str, big5: Dict[str, float], posting_style: str, writing_style: str, rng: random.Random) -> Dict:
+    nickname = "The " + rng.choice(["Wild", "Cosmic", "Tech"]) + " " + rng.choice(["Trailblazer", "Philosopher", "VibeMaster"])
+    motto = rng.choice([
         "Tweet hard, vibe easy!",
         "Code by day, memes by night!",
         "Building the future, one tweet at a time."
     ])
-    superpower = random.choice([
+    superpower = rng.choice([
         "Turning chaos into viral tweets",
         "Dropping Web3 wisdom in 280 characters",
         "Memes that spark revolutions"
     ])
-    quirk = random.choice([
+    quirk = rng.choice([
         "Tweets haikus when stressed",
         "Obsessed with late-night taco runs",
         "Has a secret meme stash"
@@ -252,97 +415,52 @@ def generate_personality_report(username: str, tweets: List[Dict]) -> Dict:
         "ipfs_hash": None
     }
 
-    try:
-        report_json = json.dumps(report)
-        ipfs_result = ipfs_client.add_str(report_json)
-        if isinstance(ipfs_result, str):
-            report["ipfs_hash"] = ipfs_result
-        elif isinstance(ipfs_result, dict) and 'Hash' in ipfs_result:
-            report["ipfs_hash"] = ipfs_result['Hash']
-        else:
-            logger.warning(f"Unexpected IPFS response: {ipfs_result}")
-            raise ValueError("Invalid IPFS response")
-        logger.info(f"Personality report saved to IPFS: {report['ipfs_hash']}")
-    except Exception as e:
-        logger.warning(f"IPFS upload failed: {e}. Saving locally.")
-        with open(f"{username}_personality.json", "w") as f:
-            json.dump(report, f)
+    report.update(publish_document(f"{username}_personality.json", report))
 
     return report
 
-def generate_trivia_questions(username: str, report: Dict, tweets: List[Dict]) -> Dict:
-    logger.debug(f"Generating 15 trivia questions for {username}")
-    questions = []
-    topics = analyze_topics(tweets)
+def generate_trivia_questions(username: str, report: Dict, tweets: Tweets, ctx: Optional[AnalysisContext] = None,
+                              variants: int = 1) -> List[Dict]:
+    """`variants` distinct 15-question games, all built from the same analysis of the tweets."""
+    logger.debug(f"Generating {variants} x 15 trivia questions for {username}")
+    ctx = ctx or AnalysisContext(tweets)
+    topics = ctx.topics
+
+    # Peak period, frequency and burstiness for the Posting Habits questions
+    habits = ctx.temporal.habits()
+
+    # Sentiment for Q3
+    is_chill_vibe = any(s["label"] in ["4 stars", "5 stars"] for s in ctx.sentiments)
+
+    return build_trivia_games(username, report, topics, habits, is_chill_vibe, ctx.content_digest, variants)
+
+def build_trivia_games(username: str, report: Dict, topics: List[str], habits: Dict, is_chill_vibe: bool,
+                       content_digest: str, variants: int = 1) -> List[Dict]:
     primary_topic = topics[0] if topics else "General"
     secondary_topic = topics[1] if len(topics) > 1 else "General"
-    has_web3 = "Web3" in topics
     logger.debug(f"Primary topic: {primary_topic}, Secondary topic: {secondary_topic}")
 
-    # Analyze tweet frequency for Q4
-    tweet_dates = [datetime.datetime.fromisoformat(t.get("created_at", "2025-01-01T00:00:00Z").replace("Z", "+00:00")).date() for t in tweets]
-    unique_days = len(set(tweet_dates))
-    is_random_bursts = unique_days >= len(tweets) and len(tweets) > 1  # Tweets on different days
+    facts = TriviaFacts(report, topics, habits, is_chill_vibe)
+    values = {**report, "topic": primary_topic, "secondary_topic": secondary_topic}
+    # Each variant draws its templates from its own RNG seeded by (username, tweets, variant)
+    with span("trivia"):
+        return [
+            build_trivia(username, templates, facts, values, variant)
+            for variant, templates in enumerate(select_variants(username, content_digest, variants))
+        ]
 
-    # Sentiment for Q3
-    texts = [t.get("text", "") for t in tweets]
-    sentiments = sentiment_analyzer(texts, batch_size=8) if texts else [{"label": "3 stars"}]
-    is_chill_vibe = any(s["label"] in ["4 stars", "5 stars"] for s in sentiments)
-
-    topic_templates = [t for t in QUESTION_TEMPLATES if t["category"] == "Topics"]
-    other_templates = [t for t in QUESTION_TEMPLATES if t["category"] != "Topics"]
-    selected_templates = random.sample(topic_templates, min(2, len(topic_templates))) + \
-                        random.sample(other_templates, 15 - min(2, len(topic_templates)))
-    logger.debug(f"Selected templates: {len(selected_templates)}")
-
-    big5 = report["big5_traits"]
-    trait_scores = {
-        "Creative": big5["Openness"],
-        "Organized": big5["Conscientiousness"],
-        "Social": big5["Extraversion"]
-    }
-    # Prioritize Social if topic includes Social and Extraversion >= 65.0
-    if "Social" in topics and big5["Extraversion"] >= 65.0:
-        max_trait = "Social"
-    else:
-        max_trait = max(trait_scores, key=lambda k: trait_scores[k] if trait_scores[k] >= 65.0 else -float('inf'))
-    trait_to_answer = {"Creative": 0, "Organized": 1, "Social": 2}
-    logger.debug(f"Trait scores: {trait_scores}, Topics: {topics}, Selected: {max_trait}, Answer: {trait_to_answer[max_trait]}")
+def build_trivia(username: str, selected_templates: List[CompiledTemplate], facts: TriviaFacts, values: Dict, variant: int = 0) -> Dict:
+    questions = []
+    logger.debug(f"Selected templates for variant {variant}: {[template.id for template in selected_templates]}")
 
     for i, template in enumerate(selected_templates, 1):
-        if template["questionText"] == "When is {username} most likely to tweet?":
-            correct_answer = 3 if "Night" in report["posting_style"] else 0
-        elif template["questionText"] == "What drives {username}'s tweets?":
-            correct_answer = 0 if has_web3 else 1
-        elif template["questionText"] == "If {username} were a movie character, what genre would they be in?":
-            correct_answer = 0
-        elif template["questionText"] == "If {username} went viral, what would it be for?":
-            correct_answer = 3
-        elif template["questionText"] == "What's {username}'s social media energy?":
-            correct_answer = 3 if "Social" in topics and big5["Extraversion"] >= 65.0 else 0  # Party starter for social users
-        elif template["questionText"] == "What's {username}'s ideal Twitter moment?":
-            correct_answer = 2
-        elif template["questionText"] == "What's {username}'s Twitter personality trait?":
-            correct_answer = trait_to_answer[max_trait]
-        elif template["questionText"] == "What's {username}'s biggest vibe?":
-            correct_answer = 0 if is_chill_vibe else 2  # Chill Vibes CEO if positive sentiment
-        elif template["questionText"] == "What's {username}'s tweet frequency vibe?":
-            correct_answer = 3 if is_random_bursts else 0  # Random bursts if tweets on different days
-        else:
-            correct_answer = template["correctAnswer"]
-            if callable(correct_answer):
-                correct_answer = correct_answer(report)
-            elif correct_answer is None:
-                correct_answer = 0 if has_web3 else 1
-
+        question_text, options = template.render(values)
         question = {
-            "questionText": template["questionText"].format(**report, topic=primary_topic, secondary_topic=secondary_topic),
-            "options": [
-                opt.format(**report, topic=primary_topic, secondary_topic=secondary_topic) if isinstance(opt, str) else opt
-                for opt in template["options"]
-            ],
-            "correctAnswer": correct_answer,
-            "category": template["category"],
+            "questionText": question_text,
+            "options": options,
+            "correctAnswer": template.resolve(facts),
+            "category": template.category,
+            "templateId": template.id,
             "stake_amount": 0.003,
             "reward": 0.0,
             "questionId": i,
@@ -361,26 +479,14 @@ def generate_trivia_questions(username: str, report: Dict, tweets: List[Dict]) -
 
     trivia = {
         "username": username,
+        "variant": variant,
         "questions": questions,
         "categories": categories,
         "ipfs_hash": None
     }
 
-    try:
-        trivia_json = json.dumps(trivia)
-        ipfs_result = ipfs_client.add_str(trivia_json)
-        if isinstance(ipfs_result, str):
-            trivia["ipfs_hash"] = ipfs_result
-        elif isinstance(ipfs_result, dict) and 'Hash' in ipfs_result:
-            trivia["ipfs_hash"] = ipfs_result['Hash']
-        else:
-            logger.warning(f"Unexpected IPFS response: {ipfs_result}")
-            raise ValueError("Invalid IPFS response")
-        logger.info(f"Trivia questions saved to IPFS: {trivia['ipfs_hash']}")
-    except Exception as e:
-        logger.warning(f"IPFS upload failed: {e}. Saving locally.")
-        with open(f"{username}_trivia.json", "w") as f:
-            json.dump(trivia, f)
+    name = f"{username}_trivia.json" if variant == 0 else f"{username}_trivia_v{variant}.json"
+    trivia.update(publish_document(name, trivia))
 
     return trivia
 
@@ -396,22 +502,295 @@ async def get_test_tweets(username: str):
     ]
     return {"username": username, "tweets": mock_tweets}
 
-@app.post("/generatePersonalityAndQuestions")
-async def generate_personality_and_questions(request: GenerateRequest):
+# Running per-user aggregates for /updatePersonalityAndQuestions
+PROFILE_STATE_DIR = os.environ.get("PROFILE_STATE_DIR", "profile_state")
+profile_store = ProfileStore(PROFILE_STATE_DIR)
+
+def fold_into_state(state: ProfileState, ctx: AnalysisContext, keys: List[str]):
+    state.fold(
+        temporal=ctx.temporal,
+        keys=keys,
+        rule_activations=trait_scorer.rule_activations(ctx.trait_features),
+        sentiment_labels=[s["label"] for s in ctx.sentiments],
+        meme_flags=ctx.is_meme,
+        thread_flags=ctx.is_thread,
+        keyword_counts=ctx.keyword_counts,
+        topic_ids=ctx.topic_ids,
+        embeddings=ctx.embeddings
+    )
+
+def topics_from_state(state: ProfileState) -> List[str]:
+    with span("topics"):
+        if uses_topic_index(state.tweet_count) and state.topic_counts:
+            return models.get("topic_index").rank_counts(state.topic_counts, limit=3) or ["General"]
+        return topics_from_keyword_counts(state.keyword_counts)
+
+def run_update(username: str, tweets: Tweets, variants: int = 1) -> Dict:
+    """Fold only tweets newer than the stored profile, then rebuild report and trivia from the aggregates."""
+    with span("profile"), profile_store.lock(username):
+        state = profile_store.load(username) or ProfileState(len(trait_scorer.rules))
+        incoming = AnalysisContext(tweets)
+        keys = [tweet_key(text, created_at) for text, created_at in zip(incoming.texts, incoming.tweets.created_at)]
+        fresh = state.select_new(incoming.temporal.epoch.tolist(), keys)
+        if fresh:
+            fold_into_state(state, AnalysisContext(incoming.tweets.take(fresh)), [keys[i] for i in fresh])
+            profile_store.save(username, state)
+    # Distinct tweets at or before the newest one folded in: already counted, or too late to be folded in
+    skipped = len(set(keys)) - len(fresh)
+    logger.info(f"Folded {len(fresh)} new tweets into {username}'s profile ({state.tweet_count} total, {skipped} skipped)")
+
+    topics = topics_from_state(state)
+    digest = state.digest()
+    with span("scoring"):
+        scores = trait_scorer.score_rates(state.rule_rates(), trait_scorer.topic_gates(topics))
+        big5 = dict(zip(trait_scorer.traits, scores.tolist()))
+        habits = state.habits()
+        posting_style = posting_style_from_habits(habits, state.tweet_count)
+        writing_style = writing_style_from_counts(state.meme_count, state.thread_count, state.tweet_count)
+        personality_report = build_personality_report(username, big5, posting_style, writing_style, variant_rng(username, digest, "report"))
+
+    games = build_trivia_games(username, personality_report, topics, habits, state.positive_count > 0, digest, variants)
+    result = generation_result(personality_report, games)
+    result.update({"new_tweets": len(fresh), "skipped_tweets": skipped, "total_tweets": state.tweet_count})
+    return result
+
+def generation_result(personality_report: Dict, games: List[Dict]) -> Dict:
+    result = {
+        "personality_report": personality_report,
+        "trivia": games[0]
+    }
+    if len(games) > 1:
+        result["trivia_variants"] = games
+    return result
+
+def run_generation(username: str, tweets: Tweets, ctx: Optional[AnalysisContext] = None, variants: int = 1) -> Dict:
+    ctx = ctx or AnalysisContext(tweets)
+    personality_report = generate_personality_report(username, tweets, ctx)
+    games = generate_trivia_questions(username, personality_report, tweets, ctx, variants)
+    return generation_result(personality_report, games)
+
+def prepare_batch_contexts(users: List[Tuple[str, TweetBatch]]) -> List[AnalysisContext]:
+    """One context per user, with sentiment, embeddings and trait scoring run as shared batches across all users."""
+    contexts = [AnalysisContext(tweets) for _, tweets in users]
+    sentiments = analyze_sentiment([text for ctx in contexts for text in ctx.texts])
+    topic_contexts = [ctx for ctx in contexts if uses_topic_index(len(ctx.tweets))]
+    embeddings = embed_texts([text for ctx in topic_contexts for text in ctx.texts]) if topic_contexts else None
+
+    offset = 0
+    for ctx in contexts:
+        ctx.prime(sentiments=sentiments[offset:offset + len(ctx.texts)])
+        offset += len(ctx.texts)
+    offset = 0
+    for ctx in topic_contexts:
+        ctx.prime(embeddings=embeddings[offset:offset + len(ctx.texts)])
+        offset += len(ctx.texts)
+
+    # Every user's traits in one padded pass over the stacked feature matrices
+    features, mask = pad_batch([ctx.trait_features for ctx in contexts], len(trait_scorer.features))
+    scores, _ = trait_scorer.score_batch(features, mask, [ctx.topics for ctx in contexts])
+    for ctx, user_scores in zip(contexts, scores):
+        ctx.prime(big5=dict(zip(trait_scorer.traits, user_scores.tolist())))
+    return contexts
+
+def generate_batch_results(users: List[Tuple[str, TweetBatch]]) -> Iterator[Dict]:
+    """Yield one result per user as it finishes; a failing user yields an error entry instead."""
     try:
-        if not request.tweets or len(request.tweets) > 50:
-            raise HTTPException(status_code=400, detail="Provide 1–50 tweets")
+        contexts = prepare_batch_contexts(users)
+    except Exception as e:
+        logger.warning(f"Pooled inference for {len(users)} users failed: {e}. Falling back to per-user inference.")
+        contexts = [AnalysisContext(tweets) for _, tweets in users]
+    for (username, tweets), ctx in zip(users, contexts):
+        try:
+            yield {"username": username, **run_generation(username, tweets, ctx)}
+        except Exception as e:
+            logger.error(f"Batch generation failed for {username}: {e}")
+            yield {"username": username, "error": str(e)}
+
+def collect_batch_results(users: List[Tuple[str, TweetBatch]]) -> List[Dict]:
+    return list(generate_batch_results(users))
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    if not models.ready():
+        return JSONResponse(status_code=503, content={"status": "warming", "models": models.status()})
+    return {"status": "ready", "models": models.status()}
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "inference_pool": inference_pool.stats(),
+        "sentiment_batcher": sentiment_batcher.stats(),
+        "sentiment_cache": sentiment_cache.stats(),
+        "embedding_cache": embedding_service.stats(),
+        "response_cache": response_cache.stats(),
+        "ipfs_publisher": ipfs_publisher.stats()
+    }
 
-        tweets = [{"text": tweet.text, "created_at": tweet.created_at} for tweet in request.tweets]
-        logger.info(f"Processing {len(tweets)} tweets for {request.username}")
+def _cache_stats():
+    return [("sentiment", sentiment_cache.stats), ("embedding", embedding_cache.stats), ("response", response_cache.stats)]
+
+def _cache_hit_samples():
+    return [({"cache": name}, stats["hits"] + stats["disk_hits"]) for name, stats in ((name, get()) for name, get in _cache_stats())]
+
+metrics_registry.collector("friendchain_cache_hits_total", "counter", "Cache lookups answered from memory or disk", _cache_hit_samples)
+metrics_registry.collector("friendchain_cache_misses_total", "counter", "Cache lookups that had to compute",
+                           lambda: stat_samples(_cache_stats(), "misses", "cache"))
+metrics_registry.collector("friendchain_cache_entries", "gauge", "Entries held in memory per cache",
+                           lambda: stat_samples(_cache_stats(), "size", "cache"))
+metrics_registry.collector("friendchain_inference_queue_depth", "gauge", "Jobs waiting behind the inference workers",
+                           lambda: [({}, inference_pool.stats()["queue_depth"])])
+metrics_registry.collector("friendchain_inference_in_flight", "gauge", "Jobs running or queued in the inference pool",
+                           lambda: [({}, inference_pool.stats()["in_flight"])])
+metrics_registry.collector("friendchain_inference_rejected_total", "counter", "Jobs rejected with 429",
+                           lambda: [({}, inference_pool.stats()["rejected"])])
+metrics_registry.collector("friendchain_inference_timeouts_total", "counter", "Jobs answered with 504",
+                           lambda: [({}, inference_pool.stats()["timeouts"])])
+metrics_registry.collector("friendchain_sentiment_batcher_queued", "gauge", "Texts waiting for the next sentiment batch",
+                           lambda: [({}, sentiment_batcher.stats()["queued"])])
+metrics_registry.collector("friendchain_ipfs_spool_depth", "gauge", "Documents waiting in the IPFS spool",
+                           lambda: [({}, ipfs_publisher.stats()["spool_depth"])])
+metrics_registry.collector("friendchain_ipfs_failures_total", "counter", "Failed IPFS uploads and flushes",
+                           lambda: [({}, ipfs_publisher.stats()["failures"])])
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ipfs/{cid}")
+async def get_ipfs_document(cid: str):
+    # Only documents this node published, straight from the local pin index
+    content = await asyncio.to_thread(ipfs_publisher.fetch, cid)
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Unknown CID {cid}")
+    return Response(content=content, media_type="application/json")
+
+def check_variants(variants: int):
+    if not 1 <= variants <= MAX_TRIVIA_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"variants must be 1–{MAX_TRIVIA_VARIANTS}")
 
-        personality_report = generate_personality_report(request.username, tweets)
-        trivia = generate_trivia_questions(request.username, personality_report, tweets)
+@app.post("/generatePersonalityAndQuestions")
+async def generate_personality_and_questions(request: GenerateRequest, variants: int = 1,
+                                             if_none_match: Optional[str] = Header(None)):
+    try:
+        if not request.tweets or len(request.tweets) > MAX_TWEETS_PER_USER:
+            raise HTTPException(status_code=400, detail=f"Provide 1–{MAX_TWEETS_PER_USER} tweets")
+        check_variants(variants)
+
+        tweets = TweetBatch.from_models(request.tweets)
+        key = request_key({
+            "endpoint": "generatePersonalityAndQuestions",
+            "models": [SENTIMENT_MODEL_ID, SENTIMENT_BACKEND, EMBEDDING_MODEL_ID],
+            "timezone": POSTING_TIMEZONE,
+            "username": request.username,
+            "tweets": [list(pair) for pair in zip(tweets.texts(), tweets.created_at)],
+            "variants": variants
+        })
+        logger.info(f"Processing {len(tweets)} tweets for {request.username}")
 
-        return {
-            "personality_report": personality_report,
-            "trivia": trivia
-        }
+        started = time.perf_counter()
+        entry, hit = await response_cache.get_or_compute(
+            key, lambda: inference_pool.run(run_generation, request.username, tweets, None, variants))
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="generatePersonalityAndQuestions")
+        headers = {"ETag": entry["etag"], "X-Cache": "HIT" if hit else "MISS"}
+        if ResponseCache.not_modified(entry, if_none_match):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry["body"], media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        logger.warning(f"Rejecting request for {request.username}: {e}")
+        raise HTTPException(status_code=429, detail="Server busy, retry later", headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    except asyncio.TimeoutError:
+        logger.error(f"Timed out generating personality and questions for {request.username}")
+        raise HTTPException(status_code=504, detail=f"Generation timed out after {INFERENCE_TIMEOUT_SECONDS}s")
     except Exception as e:
         logger.error(f"Error in generatePersonalityAndQuestions: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/updatePersonalityAndQuestions")
+async def update_personality_and_questions(request: GenerateRequest, variants: int = 1):
+    try:
+        if not request.tweets or len(request.tweets) > MAX_TWEETS_PER_USER:
+            raise HTTPException(status_code=400, detail=f"Provide 1–{MAX_TWEETS_PER_USER} tweets")
+        check_variants(variants)
+
+        tweets = TweetBatch.from_models(request.tweets)
+        logger.info(f"Updating profile for {request.username} with {len(tweets)} tweets")
+
+        started = time.perf_counter()
+        result = await inference_pool.run(run_update, request.username, tweets, variants)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="updatePersonalityAndQuestions")
+        return result
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        logger.warning(f"Rejecting update for {request.username}: {e}")
+        raise HTTPException(status_code=429, detail="Server busy, retry later", headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    except asyncio.TimeoutError:
+        logger.error(f"Timed out updating profile for {request.username}")
+        raise HTTPException(status_code=504, detail=f"Update timed out after {INFERENCE_TIMEOUT_SECONDS}s")
+    except Exception as e:
+        logger.error(f"Error in updatePersonalityAndQuestions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/generateBatch")
+async def generate_batch(request: BatchRequest):
+    if not request.users or len(request.users) > MAX_BATCH_USERS:
+        raise HTTPException(status_code=400, detail=f"Provide 1–{MAX_BATCH_USERS} users")
+
+    users = []
+    rejected = []
+    for user in request.users:
+        if not user.tweets or len(user.tweets) > MAX_TWEETS_PER_USER:
+            rejected.append({"username": user.username, "error": f"Provide 1–{MAX_TWEETS_PER_USER} tweets"})
+        else:
+            users.append((user.username, TweetBatch.from_models(user.tweets)))
+    logger.info(f"Processing batch of {len(users)} users ({len(rejected)} rejected)")
+
+    loop = asyncio.get_running_loop()
+    results = asyncio.Queue()
+
+    def produce(users: List[Tuple[str, TweetBatch]]):
+        for result in generate_batch_results(users):
+            loop.call_soon_threadsafe(results.put_nowait, result)
+
+    def finish(done):
+        # Runs however the job ended, so the stream always gets its end marker
+        if not done.cancelled() and done.exception() is not None:
+            logger.error(f"Batch generation failed: {done.exception()}")
+            loop.call_soon_threadsafe(results.put_nowait, {"error": f"Batch generation failed: {done.exception()}"})
+        loop.call_soon_threadsafe(results.put_nowait, None)
+
+    future = None
+    if users:
+        try:
+            # Results cross a process boundary only as a finished list
+            future = inference_pool.submit(collect_batch_results if inference_pool.kind == "process" else produce, users)
+            if inference_pool.kind != "process":
+                future.add_done_callback(finish)
+        except QueueFullError as e:
+            logger.warning(f"Rejecting batch of {len(users)} users: {e}")
+            raise HTTPException(status_code=429, detail="Server busy, retry later", headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+    async def stream():
+        for result in rejected:
+            yield json.dumps(result) + "\n"
+        if future is None:
+            return
+        if inference_pool.kind == "process":
+            try:
+                batch_results = await asyncio.wrap_future(future)
+            except Exception as e:
+                logger.error(f"Batch generation failed: {e}")
+                batch_results = [{"error": f"Batch generation failed: {e}"}]
+            for result in batch_results:
+                yield json.dumps(result) + "\n"
+            return
+        while (result := await results.get()) is not None:
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_NOT_LOADED = object()
+
+
+class ModelRegistry:
+    """Loads each model exactly once, on first use or during warmup.
+
+    Loaders are registered by name; `get` loads on demand under a per-model
+    lock, so concurrent first requests (or a background warmup racing a
+    request) never load the same model twice.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._errors = {}
+        self._load_seconds = {}
+        self._warmup_thread = None
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        self._loaders[name] = loader
+        self._models[name] = _NOT_LOADED
+        self._locks[name] = threading.Lock()
+
+    def override(self, name: str, model: Any):
+        """Install an already-built model (e.g. a stub for benchmarks) without running its loader."""
+        if name not in self._loaders:
+            self.register(name, lambda: model)
+        self._models[name] = model
+        self._errors.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        model = self._models[name]
+        if model is not _NOT_LOADED:
+            return model
+        with self._locks[name]:
+            if self._models[name] is _NOT_LOADED:
+                started = time.perf_counter()
+                try:
+                    self._models[name] = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    logger.error(f"Failed to load model {name}: {e}")
+                    raise
+                self._errors.pop(name, None)
+                self._load_seconds[name] = time.perf_counter() - started
+                logger.info(f"Loaded model {name} in {self._load_seconds[name]:.1f}s")
+            return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return self._models.get(name, _NOT_LOADED) is not _NOT_LOADED
+
+    def warmup(self, names: Optional[Iterable[str]] = None):
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def warmup_in_background(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        def run():
+            try:
+                self.warmup(names)
+            except Exception as e:
+                logger.error(f"Background model warmup failed: {e}")
+
+        self._warmup_thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def ready(self) -> bool:
+        return all(self.is_loaded(name) for name in self._loaders)
+
+    def status(self) -> Dict[str, Dict]:
+        status = {}
+        for name in self._loaders:
+            if self.is_loaded(name):
+                status[name] = {"state": "loaded", "load_seconds": self._load_seconds.get(name)}
+            elif name in self._errors:
+                status[name] = {"state": "failed", "error": self._errors[name]}
+            elif self._locks[name].locked():
+                status[name] = {"state": "loading"}
+            else:
+                status[name] = {"state": "pending"}
+        return status
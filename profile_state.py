@@ -0,0 +1,218 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from temporal_features import TemporalFeatures, posting_habits
+
+POSITIVE_LABELS = ("4 stars", "5 stars")
+
+
+def tweet_key(text: str, created_at: str) -> str:
+    return hashlib.sha1(f"{created_at}\0{text}".encode("utf-8")).hexdigest()[:16]
+
+
+class ProfileState:
+    """Running per-user aggregates that the report and trivia are derived from.
+
+    Folding in a batch of tweets only touches counters, so an update costs
+    O(new tweets) no matter how long the user's history is. Tweets at or
+    before the newest tweet already folded in are treated as seen.
+    """
+
+    def __init__(self, n_rules: int):
+        self.tweet_count = 0
+        self.rule_counts = [0] * n_rules
+        self.sentiment_counts = Counter()
+        self.hour_counts = [0] * 24
+        self.dow_counts = [0] * 7
+        self.active_days = set()  # local day numbers since 1970-01-01
+        self.first_seen = None
+        # Running moments of the gaps between consecutive tweets, for burstiness
+        self.gap_count = 0
+        self.gap_sum = 0.0
+        self.gap_sumsq = 0.0
+        self.meme_count = 0
+        self.thread_count = 0
+        self.keyword_counts = Counter()
+        self.topic_counts = Counter()
+        self.embedding_sum = None
+        self.embedding_count = 0
+        self.watermark = None
+        self.watermark_keys = set()
+        self.updated_at = None
+
+    def select_new(self, timestamps: Sequence[float], keys: Sequence[str]) -> List[int]:
+        """Indices of tweets newer than the watermark, skipping duplicates within the batch too.
+
+        Older tweets are never folded in, even if they were not seen before,
+        because the gap moments assume tweets arrive in time order.
+        """
+        selected = []
+        batch_keys = set()
+        for i, (ts, key) in enumerate(zip(timestamps, keys)):
+            if key in batch_keys:
+                continue
+            if self.watermark is None or ts > self.watermark or (ts == self.watermark and key not in self.watermark_keys):
+                selected.append(i)
+                batch_keys.add(key)
+        return selected
+
+    def fold(self, temporal: TemporalFeatures, keys: Sequence[str], rule_activations: np.ndarray,
+             sentiment_labels: Sequence[str], meme_flags: Sequence[bool], thread_flags: Sequence[bool], keyword_counts: Dict[str, int],
+             topic_ids: Optional[Sequence[int]] = None, embeddings: Optional[np.ndarray] = None):
+        if not len(keys):
+            return
+        if rule_activations.shape[1] != len(self.rule_counts):
+            raise ValueError("Profile state was built with different trait rules; regenerate it from the full history")
+        self.tweet_count += len(keys)
+        self.rule_counts = (np.asarray(self.rule_counts) + rule_activations.sum(axis=0)).astype(int).tolist()
+        self.sentiment_counts.update(sentiment_labels)
+        self.hour_counts = (np.asarray(self.hour_counts) + temporal.hour_counts).tolist()
+        self.dow_counts = (np.asarray(self.dow_counts) + temporal.dow_counts).tolist()
+        self.active_days.update(temporal.active_days.tolist())
+        # New tweets are never older than the watermark, so the gaps continue from it
+        ordered = np.sort(temporal.epoch)
+        if self.watermark is not None:
+            ordered = np.concatenate(([self.watermark], ordered))
+        gaps = np.diff(ordered).astype(np.float64)
+        self.gap_count += len(gaps)
+        self.gap_sum += float(gaps.sum())
+        self.gap_sumsq += float((gaps ** 2).sum())
+        self.meme_count += int(np.count_nonzero(meme_flags))
+        self.thread_count += int(np.count_nonzero(thread_flags))
+        self.keyword_counts.update(keyword_counts)
+        if topic_ids is not None:
+            self.topic_counts.update(int(t) for t in topic_ids)
+        if embeddings is not None and len(embeddings):
+            batch_sum = np.asarray(embeddings, dtype=np.float64).sum(axis=0)
+            self.embedding_sum = batch_sum if self.embedding_sum is None else self.embedding_sum + batch_sum
+            self.embedding_count += len(embeddings)
+
+        timestamps = temporal.epoch.tolist()
+        if self.first_seen is None:
+            self.first_seen = min(timestamps)
+        newest = max(timestamps)
+        if self.watermark is None or newest > self.watermark:
+            self.watermark = newest
+            self.watermark_keys = set()
+        self.watermark_keys.update(key for ts, key in zip(timestamps, keys) if ts == self.watermark)
+        self.updated_at = time.time()
+
+    def digest(self) -> str:
+        """Changes exactly when new tweets are folded in."""
+        key = f"{self.tweet_count}\0{self.watermark}\0{','.join(sorted(self.watermark_keys))}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def habits(self) -> Dict:
+        return posting_habits(
+            self.tweet_count, self.hour_counts, self.dow_counts, len(self.active_days), self.first_seen,
+            self.watermark, self.gap_count, self.gap_sum, self.gap_sumsq
+        )
+
+    def rule_rates(self) -> np.ndarray:
+        return np.asarray(self.rule_counts, dtype=np.float64) / max(self.tweet_count, 1)
+
+    @property
+    def positive_count(self) -> int:
+        return sum(self.sentiment_counts[label] for label in POSITIVE_LABELS)
+
+    @property
+    def mean_embedding(self) -> Optional[np.ndarray]:
+        return self.embedding_sum / self.embedding_count if self.embedding_count else None
+
+    def to_dict(self) -> Dict:
+        return {
+            "tweet_count": self.tweet_count,
+            "rule_counts": self.rule_counts,
+            "sentiment_counts": dict(self.sentiment_counts),
+            "hour_counts": self.hour_counts,
+            "dow_counts": self.dow_counts,
+            "active_days": sorted(self.active_days),
+            "first_seen": self.first_seen,
+            "gap_count": self.gap_count,
+            "gap_sum": self.gap_sum,
+            "gap_sumsq": self.gap_sumsq,
+            "meme_count": self.meme_count,
+            "thread_count": self.thread_count,
+            "keyword_counts": dict(self.keyword_counts),
+            "topic_counts": {str(topic): count for topic, count in self.topic_counts.items()},
+            "embedding_sum": self.embedding_sum.tolist() if self.embedding_sum is not None else None,
+            "embedding_count": self.embedding_count,
+            "watermark": self.watermark,
+            "watermark_keys": sorted(self.watermark_keys),
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ProfileState":
+        state = cls(len(data["rule_counts"]))
+        state.tweet_count = data["tweet_count"]
+        state.rule_counts = list(data["rule_counts"])
+        state.sentiment_counts = Counter(data["sentiment_counts"])
+        state.hour_counts = list(data["hour_counts"])
+        state.dow_counts = list(data["dow_counts"])
+        state.active_days = set(data["active_days"])
+        state.first_seen = data["first_seen"]
+        state.gap_count = data["gap_count"]
+        state.gap_sum = data["gap_sum"]
+        state.gap_sumsq = data["gap_sumsq"]
+        state.meme_count = data["meme_count"]
+        state.thread_count = data["thread_count"]
+        state.keyword_counts = Counter(data["keyword_counts"])
+        state.topic_counts = Counter({int(topic): count for topic, count in data["topic_counts"].items()})
+        state.embedding_sum = np.asarray(data["embedding_sum"]) if data.get("embedding_sum") is not None else None
+        state.embedding_count = data.get("embedding_count", 0)
+        state.watermark = data.get("watermark")
+        state.watermark_keys = set(data.get("watermark_keys", []))
+        state.updated_at = data.get("updated_at")
+        return state
+
+
+class ProfileStore:
+    """One JSON file per user, written atomically.
+
+    `lock` serializes read-modify-write per user across threads and, through
+    a lock file, across inference worker processes.
+    """
+
+    def __init__(self, directory: str = "profile_state"):
+        self.directory = directory
+        self._locks = {}
+        self._guard = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, username: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.-]", "_", username) + ".json")
+
+    @contextmanager
+    def lock(self, username: str):
+        with self._guard:
+            thread_lock = self._locks.setdefault(username, threading.Lock())
+        with thread_lock, open(self._path(username) + ".lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load(self, username: str) -> Optional[ProfileState]:
+        try:
+            with open(self._path(username), "r") as f:
+                return ProfileState.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save(self, username: str, state: ProfileState):
+        path = self._path(username)
+        with open(path + ".tmp", "w") as f:
+            json.dump(state.to_dict(), f)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from content_cache import MISSING, ContentCache
+from ipfs_cid import canonical_json
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(payload: Dict) -> str:
+    """sha256 of the canonical JSON form of a request, so key order and spacing don't matter."""
+    return hashlib.sha256(canonical_json(payload)).hexdigest()
+
+
+class ResponseCache:
+    """Idempotent endpoint responses keyed by canonical request hash.
+
+    Entries live in a ContentCache (in-memory LRU with TTL plus an optional
+    pluggable second tier). Concurrent identical requests are coalesced:
+    the first one computes, the others await the same result (single-flight).
+    Failures are shared with the waiters but never cached.
+    """
+
+    def __init__(self, cache: ContentCache):
+        self.cache = cache
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._coalesced = 0
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        """Returns ({"etag", "body"}, hit) where body is the response's canonical JSON."""
+        entry = self.cache.get(key)
+        if entry is not MISSING:
+            return entry, True
+        flight = self._inflight.get(key)
+        if flight is not None:
+            with self._lock:
+                self._coalesced += 1
+            return await asyncio.shield(flight), True
+
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = flight
+        try:
+            body = canonical_json(await compute())
+            entry = {"etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"', "body": body}
+            self.cache.set(key, entry)
+            flight.set_result(entry)
+            return entry, False
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Mark retrieved so a flight nobody else awaited doesn't log "exception never retrieved"
+            flight.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def not_modified(entry: Dict, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or entry["etag"] in tags or f"W/{entry['etag']}" in tags
+
+    def stats(self) -> Dict:
+        with self._lock:
+            coalesced = self._coalesced
+        return {**self.cache.stats(), "inflight": len(self._inflight), "coalesced": coalesced}
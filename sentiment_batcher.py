@@ -0,0 +1,106 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentBatcher:
+    """Dynamic micro-batcher in front of the sentiment pipeline.
+
+    Texts submitted by concurrent requests are collected for up to
+    `max_wait_ms` (or until `max_batch_size` texts are waiting), sorted by
+    length so padding stays small, run through the pipeline together and
+    handed back to their callers in the original order.
+    """
+
+    def __init__(self, analyzer: Callable, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 model_batch_size: int = None, **pipeline_kwargs):
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.model_batch_size = model_batch_size or max_batch_size
+        self.pipeline_kwargs = pipeline_kwargs
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._items = 0
+        self._requests = 0
+        self._errors = 0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_forever, name="sentiment-batcher", daemon=True)
+                self._thread.start()
+
+    def analyze(self, texts: List[str]) -> List[Dict]:
+        """Blocking call: returns one pipeline result per text."""
+        if not texts:
+            return []
+        self._ensure_worker()
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        with self._lock:
+            self._requests += 1
+        return [future.result() for future in futures]
+
+    def _collect(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_forever(self):
+        while True:
+            batch = self._collect()
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List):
+        order = sorted(range(len(batch)), key=lambda i: len(batch[i][0]))
+        texts = [batch[i][0] for i in order]
+        try:
+            results = self.analyzer(texts, batch_size=self.model_batch_size, **self.pipeline_kwargs)
+        except Exception as e:
+            logger.error(f"Sentiment batch of {len(batch)} failed: {e}")
+            with self._lock:
+                self._errors += 1
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for i, result in zip(order, results):
+            batch[i][1].set_result(result)
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+        logger.debug(f"Sentiment batch: {len(batch)}/{self.max_batch_size} texts")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            batches = self._batches
+            items = self._items
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "requests": self._requests,
+                "batches": batches,
+                "items": items,
+                "errors": self._errors,
+                "queued": self._queue.qsize(),
+                "avg_batch_size": items / batches if batches else 0.0,
+                "fill_rate": items / (batches * self.max_batch_size) if batches else 0.0
+            }
@@ -0,0 +1,187 @@
+import datetime
+import math
+import re
+from functools import cached_property
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+# Quiz periods for "When is {username} most likely to tweet?", in the template's option order
+PERIODS = (("Morning", 6, 12), ("Afternoon", 12, 18), ("Evening", 18, 24), ("3am", 0, 6))
+# Gap burstiness above this reads as long silences followed by floods
+BURSTY_THRESHOLD = 0.3
+# Share of calendar days with a tweet, between the first and last tweet
+DAILY_COVERAGE = 0.6
+WEEKLY_COVERAGE = 0.2
+
+_TZ_SUFFIX = re.compile(r"(Z|[+-]\d{2}:?\d{2})$")
+
+
+def _offset_seconds(suffix: str) -> int:
+    if suffix == "Z":
+        return 0
+    digits = suffix[1:].replace(":", "")
+    offset = int(digits[:2]) * 3600 + int(digits[2:]) * 60
+    return -offset if suffix[0] == "-" else offset
+
+
+def parse_timestamps(values: Sequence[str]) -> np.ndarray:
+    """UTC epoch seconds (int64) for ISO-8601 strings; strings without an offset count as UTC.
+
+    Offsets are stripped in Python, the datetimes themselves are parsed by
+    NumPy in one vectorized call.
+    """
+    values = list(values)
+    if all(value.endswith("Z") for value in values):
+        local = [value[:-1] for value in values]
+        offsets = 0
+    else:
+        local = []
+        offsets = np.zeros(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            match = _TZ_SUFFIX.search(value)
+            if match:
+                local.append(value[:match.start()])
+                offsets[i] = _offset_seconds(match.group(1))
+            else:
+                local.append(value)
+    try:
+        milliseconds = np.array(local, dtype="datetime64[ms]").astype(np.int64)
+    except ValueError:
+        # Anything NumPy can't read goes through datetime, which raises on truly invalid input
+        parsed = [datetime.datetime.fromisoformat(value.replace("Z", "+00:00")) for value in values]
+        return np.array([
+            int((ts if ts.tzinfo else ts.replace(tzinfo=datetime.timezone.utc)).timestamp()) for ts in parsed
+        ], dtype=np.int64)
+    return milliseconds // 1000 - offsets
+
+
+def utc_offsets(epoch: np.ndarray, timezone: Optional[str] = None) -> np.ndarray:
+    """Per-timestamp UTC offset in seconds for `timezone` (an IANA name or ±HH:MM), DST-aware.
+
+    IANA zones are looked up once per distinct hour, not once per tweet.
+    """
+    if not timezone or timezone == "UTC":
+        return np.zeros(len(epoch), dtype=np.int64)
+    if _TZ_SUFFIX.fullmatch(timezone):
+        return np.full(len(epoch), _offset_seconds(timezone), dtype=np.int64)
+    from zoneinfo import ZoneInfo
+    zone = ZoneInfo(timezone)
+    hours, inverse = np.unique(epoch // 3600, return_inverse=True)
+    offsets = np.array([
+        int(datetime.datetime.fromtimestamp(int(hour) * 3600, zone).utcoffset().total_seconds()) for hour in hours
+    ], dtype=np.int64)
+    return offsets[inverse.reshape(-1)]
+
+
+def check_timezone(timezone: str) -> str:
+    """`timezone` if utc_offsets accepts it, so a bad setting fails at startup instead of on every request."""
+    if _TZ_SUFFIX.fullmatch(timezone) and timezone != "Z":
+        valid = int(timezone[-2:]) < 60 and abs(_offset_seconds(timezone)) <= 14 * 3600
+    else:
+        try:
+            utc_offsets(np.zeros(1, dtype=np.int64), timezone)
+            valid = True
+        except Exception:
+            valid = False
+    if not valid:
+        raise ValueError(f"Invalid timezone {timezone!r}: use an IANA name (Europe/Berlin), UTC or a ±HH:MM offset")
+    return timezone
+
+
+def burstiness(gap_count: int, gap_sum: float, gap_sumsq: float) -> float:
+    """Burstiness of inter-post gaps: -1 periodic, ~0 random, towards 1 bursty.
+
+    Goh-Barabasi (std - mean) / (std + mean) with the Kim-Jo correction, which
+    keeps short histories from reading as regular just because they have few gaps.
+    """
+    if gap_count < 2:
+        return 0.0
+    mean = gap_sum / gap_count
+    if mean <= 0:
+        return 0.0
+    ratio = math.sqrt(max(gap_sumsq / gap_count - mean * mean, 0.0)) / mean
+    upper, lower = math.sqrt(gap_count + 1), math.sqrt(gap_count - 1)
+    denominator = (upper - 2) * ratio + lower
+    if denominator <= 0:
+        return 1.0
+    return max(-1.0, min(1.0, (upper * ratio - lower) / denominator))
+
+
+def posting_habits(tweet_count: int, hour_counts: Sequence[int], dow_counts: Sequence[int], active_days: int,
+                   first: Optional[int], last: Optional[int], gap_count: int, gap_sum: float, gap_sumsq: float) -> Dict:
+    """Posting Habits answers from aggregates, so per-request features and stored profiles share one definition."""
+    periods = {name: int(sum(hour_counts[start:end])) for name, start, end in PERIODS}
+    span_days = (last - first) // SECONDS_PER_DAY + 1 if tweet_count else 0
+    coverage = active_days / span_days if span_days else 0.0
+    bursty = burstiness(gap_count, gap_sum, gap_sumsq)
+    if tweet_count < 2 or coverage >= DAILY_COVERAGE and bursty < BURSTY_THRESHOLD:
+        frequency = "Daily poster"
+    elif bursty >= BURSTY_THRESHOLD:
+        frequency = "Ghost then flood"
+    elif coverage <= WEEKLY_COVERAGE:
+        frequency = "Once a week"
+    else:
+        frequency = "Random bursts"
+    return {
+        "peak_period": max(periods, key=periods.get) if tweet_count else PERIODS[0][0],
+        "busiest_day": WEEKDAYS[int(np.argmax(dow_counts))] if tweet_count else None,
+        "frequency": frequency,
+        "burstiness": bursty,
+        "active_days": active_days,
+        "active_day_coverage": coverage,
+        "mean_gap_hours": gap_sum / gap_count / 3600 if gap_count else None
+    }
+
+
+class TemporalFeatures:
+    """Posting-time features over one int64 array of epoch seconds, all vectorized.
+
+    Hours, weekdays and days are in `timezone` (UTC by default).
+    """
+
+    def __init__(self, epoch_seconds: Sequence[int], timezone: Optional[str] = None):
+        self.epoch = np.asarray(epoch_seconds, dtype=np.int64)
+        self.timezone = timezone
+        local = self.epoch + utc_offsets(self.epoch, timezone)
+        self.local_days = local // SECONDS_PER_DAY
+        self.hours = local % SECONDS_PER_DAY // 3600
+        # 1970-01-01 was a Thursday; Monday is 0
+        self.weekdays = (self.local_days + 3) % 7
+
+    @classmethod
+    def from_strings(cls, values: Sequence[str], timezone: Optional[str] = None) -> "TemporalFeatures":
+        return cls(parse_timestamps(values), timezone)
+
+    def __len__(self) -> int:
+        return len(self.epoch)
+
+    @cached_property
+    def hour_counts(self) -> np.ndarray:
+        return np.bincount(self.hours, minlength=24)
+
+    @cached_property
+    def dow_counts(self) -> np.ndarray:
+        return np.bincount(self.weekdays, minlength=7)
+
+    @cached_property
+    def active_days(self) -> np.ndarray:
+        return np.unique(self.local_days)
+
+    @property
+    def unique_days(self) -> int:
+        return len(self.active_days)
+
+    @cached_property
+    def gaps(self) -> np.ndarray:
+        """Seconds between consecutive posts, in time order."""
+        return np.diff(np.sort(self.epoch)).astype(np.float64)
+
+    def habits(self) -> Dict:
+        return posting_habits(
+            len(self), self.hour_counts, self.dow_counts, self.unique_days,
+            int(self.epoch.min()) if len(self) else None, int(self.epoch.max()) if len(self) else None,
+            len(self.gaps), float(self.gaps.sum()), float((self.gaps ** 2).sum())
+        )
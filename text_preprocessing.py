@@ -0,0 +1,122 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+# NLTK's English stopword list, vendored so preprocessing needs no downloaded corpora
+STOPWORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself yourselves he him his
+himself she she's her hers herself it it's its itself they them their theirs themselves what which who whom this
+that that'll these those am is are was were be been being have has had having do does did doing a an the and but
+if or because as until while of at by for with about against between into through during before after above below
+to from up down in out on off over under again further then once here there when where why how all any both each
+few more most other some such no nor not only own same so than too very s t can will just don don't should
+should've now d ll m o re ve y ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't
+haven haven't isn isn't ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn shouldn't wasn wasn't
+weren weren't won won't wouldn wouldn't
+""".split())
+
+# Process-pool preprocessing for large archives: PREPROCESS_WORKERS > 1 enables it,
+# texts go to the workers PREPROCESS_CHUNK_SIZE at a time
+PREPROCESS_WORKERS = int(os.environ.get("PREPROCESS_WORKERS", "0"))
+PREPROCESS_CHUNK_SIZE = int(os.environ.get("PREPROCESS_CHUNK_SIZE", "500"))
+
+# NLTK's word_tokenize, compiled once: punkt's sentence split approximated by
+# breaking after ".", "?" or "!" (plus one closing bracket or quote) and
+# whitespace, then NLTKWordTokenizer's substitutions verbatim. Differences are
+# limited to punkt's learned abbreviations ("dr.", "e.g."), which it keeps whole.
+# Each substitution lists the characters it needs, so rules that cannot fire on
+# a sentence are skipped without running the regex.
+_SENTENCE_END = re.compile(r"(?<=[.?!][\]\)}>\"'»”’])\s+|(?<=[.?!])\s+")
+
+
+def _rules(specs) -> List[Tuple[re.Pattern, str, Optional[FrozenSet[str]]]]:
+    return [(re.compile(pattern), substitution, frozenset(triggers) if triggers else None)
+            for pattern, substitution, triggers in specs]
+
+
+_RULES = _rules((
+    # Starting quotes
+    (r"([«“‘„]|[`]+)", r" \1 ", "«“‘„`"),
+    (r'^\"', r"``", '"'),
+    (r"(``)", r" \1 ", '`"'),
+    (r"([ \(\[{<])(\"|\'{2})", r"\1 `` ", "\"'"),
+    (r"(?i)(?<!\w)(\')(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)", r"\1 ", "'"),
+    # Punctuation
+    (r'([^\.])(\.)([\]\)}>"\'»”’ ]*)\s*$', r"\1 \2 \3 ", "."),
+    (r"([:,])([^\d])", r" \1 \2", ":,"),
+    (r"([:,])$", r" \1 ", ":,"),
+    (r"\.{2,}", r" \g<0> ", "."),
+    (r"[;@#$%&]", r" \g<0> ", ";@#$%&"),
+    (r"[\u2012-\u2015]", r" \g<0> ", "\u2012\u2013\u2014\u2015"),
+    (r'([^\.])(\.)([\]\)}>"\']*)\s*$', r"\1 \2\3 ", "."),
+    (r"[?!]", r" \g<0> ", "?!"),
+    (r"([^'])' ", r"\1 ' ", "'"),
+    (r"[*]", r" \g<0> ", "*"),
+    (r"[\]\[\(\)\{\}\<\>]", r" \g<0> ", "[](){}<>"),
+    (r"--", r" -- ", "-")
+))
+# Applied to " " + sentence + " "; None means always
+_ENDING_RULES = _rules((
+    (r"([»”’])", r" \1 ", "»”’"),
+    (r"''", " '' ", "'"),
+    (r'"', " '' ", '"'),
+    (r"\s+", " ", None),
+    (r"([^' ])('[sS]|'[mM]|'[dD]|') ", r"\1 \2 ", "'"),
+    (r"([^' ])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T) ", r"\1 \2 ", "'")
+))
+_CONTRACTIONS = [
+    re.compile(pattern) for pattern in (
+        r"(?i)\b(can)(not)\b", r"(?i)\b(d)('ye)\b", r"(?i)\b(gim)(me)\b", r"(?i)\b(gon)(na)\b",
+        r"(?i)\b(got)(ta)\b", r"(?i)\b(lem)(me)\b", r"(?i)\b(more)('n)\b", r"(?i)\b(wan)(na)(?=\s)",
+        r"(?i) ('t)(is)\b", r"(?i) ('t)(was)\b"
+    )
+]
+_CONTRACTION_HINT = re.compile(r"(?i)cannot|d'ye|gimme|gonna|gotta|lemme|more'n|wanna|'t(?:is|was)")
+
+
+def _tokenize_sentence(text: str) -> List[str]:
+    # Rules only ever add spaces and backticks, so the original characters decide which can fire
+    chars = set(text)
+    for regex, substitution, triggers in _RULES:
+        if not triggers.isdisjoint(chars):
+            text = regex.sub(substitution, text)
+    text = " " + text + " "
+    for regex, substitution, triggers in _ENDING_RULES:
+        if triggers is None or not triggers.isdisjoint(chars):
+            text = regex.sub(substitution, text)
+    if _CONTRACTION_HINT.search(text):
+        for regex in _CONTRACTIONS:
+            text = regex.sub(r" \1 \2 ", text)
+    return text.split()
+
+
+def word_tokenize(text: str) -> List[str]:
+    """Drop-in for nltk.word_tokenize that needs no downloaded punkt model."""
+    return [token for sentence in _SENTENCE_END.split(text) for token in _tokenize_sentence(sentence)]
+
+
+def clean_text(lowered_text: str) -> str:
+    """Drop hashtags, mentions and URLs, then keep non-stopword alphabetic tokens."""
+    text = ' '.join(word for word in lowered_text.split() if not (word.startswith('#') or word.startswith('@') or 'http' in word))
+    return ' '.join(token for token in word_tokenize(text) if token.isalpha() and token not in STOPWORDS)
+
+
+def clean_texts(lowered_texts: Iterable[str]) -> List[str]:
+    return [clean_text(text) for text in lowered_texts]
+
+
+@lru_cache(maxsize=1)
+def _pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def preprocess_texts(lowered_texts: List[str], workers: int = None, chunk_size: int = None) -> List[str]:
+    """clean_text for every text, on a process pool in chunks when `workers` > 1 and there is more than one chunk."""
+    workers = PREPROCESS_WORKERS if workers is None else workers
+    chunk_size = chunk_size or PREPROCESS_CHUNK_SIZE
+    if workers <= 1 or len(lowered_texts) <= chunk_size:
+        return clean_texts(lowered_texts)
+    chunks = [lowered_texts[start:start + chunk_size] for start in range(0, len(lowered_texts), chunk_size)]
+    return [text for cleaned in _pool(workers).map(clean_texts, chunks) for text in cleaned]
@@ -0,0 +1,129 @@
+import argparse
+import json
+import logging
+import os
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_ID = "all-MiniLM-L6-v2"
+OUTLIER_TOPIC = -1
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class TopicIndex:
+    """Pre-fitted topics served as a nearest-centroid lookup.
+
+    BERTopic is only fitted offline (see `fit_topic_index`). At request time a
+    batch of sentence embeddings is matched against the stored topic centroids
+    with one matrix product, and labels come from a plain dict.
+    """
+
+    def __init__(self, topic_ids: Sequence[int], centroids: np.ndarray, labels: Dict[int, str],
+                 embedding_model_id: str = EMBEDDING_MODEL_ID, min_similarity: float = 0.25):
+        self.topic_ids = np.asarray(topic_ids, dtype=np.int64)
+        self.centroids = _normalize_rows(np.asarray(centroids, dtype=np.float32))
+        self.labels = {int(topic): label for topic, label in labels.items()}
+        self.embedding_model_id = embedding_model_id
+        self.min_similarity = min_similarity
+
+    def assign(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the nearest topic id and cosine similarity for each embedding row."""
+        if len(embeddings) == 0 or len(self.topic_ids) == 0:
+            return np.full(len(embeddings), OUTLIER_TOPIC, dtype=np.int64), np.zeros(len(embeddings), dtype=np.float32)
+        similarities = _normalize_rows(np.asarray(embeddings, dtype=np.float32)) @ self.centroids.T
+        best = similarities.argmax(axis=1)
+        best_similarity = similarities[np.arange(len(best)), best]
+        topics = np.where(best_similarity >= self.min_similarity, self.topic_ids[best], OUTLIER_TOPIC)
+        return topics, best_similarity
+
+    def rank_labels(self, topics: Sequence[int], limit: int = 3) -> List[str]:
+        """Labels of the most frequent non-outlier topics, most frequent first."""
+        return self.rank_counts(Counter(int(t) for t in topics), limit)
+
+    def rank_counts(self, counts: Dict[int, int], limit: int = 3) -> List[str]:
+        """Like `rank_labels`, from per-topic counts accumulated elsewhere."""
+        ranked = Counter({topic: n for topic, n in counts.items() if topic != OUTLIER_TOPIC and n > 0})
+        return [self.labels[topic] for topic, _ in ranked.most_common(limit)]
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        with open(os.path.join(path, "topics.json"), "w") as f:
+            json.dump({
+                "embedding_model_id": self.embedding_model_id,
+                "min_similarity": self.min_similarity,
+                "topic_ids": self.topic_ids.tolist(),
+                "labels": {str(topic): label for topic, label in self.labels.items()}
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "TopicIndex":
+        with open(os.path.join(path, "topics.json"), "r") as f:
+            meta = json.load(f)
+        return cls(
+            topic_ids=meta["topic_ids"],
+            centroids=np.load(os.path.join(path, "centroids.npy")),
+            labels={int(topic): label for topic, label in meta["labels"].items()},
+            embedding_model_id=meta.get("embedding_model_id", EMBEDDING_MODEL_ID),
+            min_similarity=meta.get("min_similarity", 0.25)
+        )
+
+
+def fit_topic_index(docs: List[str], embeddings: np.ndarray, embedding_model=None, min_topic_size: int = 2,
+                    min_similarity: float = 0.25, embedding_model_id: str = EMBEDDING_MODEL_ID):
+    """Fit BERTopic once on a corpus and derive the centroids used at serve time."""
+    from bertopic import BERTopic
+
+    model = BERTopic(min_topic_size=min_topic_size, embedding_model=embedding_model)
+    topics, _ = model.fit_transform(docs, embeddings=embeddings)
+    topic_info = model.get_topic_info()
+    names = dict(zip(topic_info["Topic"], topic_info["Name"]))
+
+    topics = np.asarray(topics)
+    normalized = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    topic_ids = sorted(int(t) for t in set(topics.tolist()) if t != OUTLIER_TOPIC)
+    centroids = np.vstack([normalized[topics == t].mean(axis=0) for t in topic_ids]) if topic_ids else np.zeros((0, normalized.shape[1]))
+    index = TopicIndex(topic_ids, centroids, {t: names[t] for t in topic_ids}, embedding_model_id, min_similarity)
+    logger.info(f"Fitted topic index with {len(topic_ids)} topics on {len(docs)} documents")
+    return index, model
+
+
+def _load_corpus(paths: List[str]) -> List[str]:
+    docs = []
+    for path in paths:
+        with open(path, "r") as f:
+            tweets = json.load(f)
+        docs.extend(t["text"] for t in tweets if t.get("text"))
+    return docs
+
+
+if __name__ == "__main__":
+    from embedding_service import create_embedding_service
+
+    parser = argparse.ArgumentParser(description="Fit the topic model offline and save the serving index.")
+    parser.add_argument("corpus", nargs="+", help="Tweet JSON files ([{\"text\": ..., \"created_at\": ...}])")
+    parser.add_argument("--out", default="models/topic_index", help="Output directory for the topic index")
+    parser.add_argument("--min-topic-size", type=int, default=2)
+    parser.add_argument("--min-similarity", type=float, default=0.25)
+    parser.add_argument("--save-bertopic", action="store_true", help="Also save the fitted BERTopic model")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    docs = _load_corpus(args.corpus)
+    # Corpus vectors go through the shared store, so serving never re-encodes these tweets
+    embedding_service = create_embedding_service(EMBEDDING_MODEL_ID)
+    embeddings = embedding_service.embed(docs)
+    index, model = fit_topic_index(docs, embeddings, embedding_service.get_model(), args.min_topic_size, args.min_similarity)
+    index.save(args.out)
+    if args.save_bertopic:
+        model.save(os.path.join(args.out, "bertopic_model"), serialization="pickle")
+    print(f"Saved topic index with {len(index.topic_ids)} topics to {args.out}")
@@ -0,0 +1,100 @@
+import json
+import os
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trait_weights.json")
+
+
+class TraitScorer:
+    """Vectorized Big Five scoring over a tweet feature matrix.
+
+    Each tweet is a row of binary features: keyword categories from the
+    KeywordEngine plus a one-hot sentiment label. A rule fires for a tweet when
+    any of its features is set; the share of tweets firing each rule, gated
+    by the topics it requires, is multiplied by the (rules x traits) weight
+    matrix and added to the base score.
+    """
+
+    def __init__(self, config: Dict, keyword_categories: Sequence[str]):
+        self.base = float(config.get("base", 50.0))
+        self.traits = list(config["traits"])
+        self.sentiment_labels = list(config["sentiment_labels"])
+        self.features = list(keyword_categories) + [f"sentiment.{label}" for label in self.sentiment_labels]
+        self._feature_index = {name: i for i, name in enumerate(self.features)}
+        self._keyword_index = {name: i for i, name in enumerate(keyword_categories)}
+        self._sentiment_index = {label: len(keyword_categories) + i for i, label in enumerate(self.sentiment_labels)}
+
+        rules = config["rules"]
+        self.rules = rules
+        self.membership = np.zeros((len(self.features), len(rules)), dtype=np.float32)
+        self.weights = np.zeros((len(rules), len(self.traits)), dtype=np.float64)
+        self.required_topics = [rule.get("requires_topic") for rule in rules]
+        for r, rule in enumerate(rules):
+            for feature in rule["any_of"]:
+                if feature not in self._feature_index:
+                    raise ValueError(f"Trait rule for {rule['trait']} uses unknown feature {feature}")
+                self.membership[self._feature_index[feature], r] = 1.0
+            self.weights[r, self.traits.index(rule["trait"])] = float(rule["weight"])
+
+    @classmethod
+    def from_file(cls, keyword_categories: Sequence[str], path: str = DEFAULT_WEIGHTS_PATH) -> "TraitScorer":
+        with open(path, "r") as f:
+            return cls(json.load(f), keyword_categories)
+
+    def feature_matrix(self, keyword_hits: Sequence[FrozenSet[str]], sentiment_labels: Sequence[str]) -> np.ndarray:
+        """(n_tweets x n_features) binary matrix for one user."""
+        matrix = np.zeros((len(keyword_hits), len(self.features)), dtype=np.float32)
+        for row, (hits, label) in enumerate(zip(keyword_hits, sentiment_labels)):
+            for category in hits:
+                column = self._keyword_index.get(category)
+                if column is not None:
+                    matrix[row, column] = 1.0
+            column = self._sentiment_index.get(label)
+            if column is not None:
+                matrix[row, column] = 1.0
+        return matrix
+
+    def topic_gates(self, topics: Sequence[str]) -> np.ndarray:
+        return np.array([1.0 if required is None or required in topics else 0.0 for required in self.required_topics])
+
+    def rule_activations(self, features: np.ndarray) -> np.ndarray:
+        """Per-tweet rule firings: (..., n_tweets, n_rules) booleans."""
+        return (features @ self.membership) > 0
+
+    def score(self, features: np.ndarray, topics: Sequence[str]) -> Dict[str, float]:
+        scores, _ = self.score_batch(features[np.newaxis], np.ones((1, len(features)), dtype=bool), [topics])
+        return dict(zip(self.traits, scores[0].tolist()))
+
+    def score_rates(self, rates: np.ndarray, gates: np.ndarray) -> np.ndarray:
+        """Trait scores from per-rule firing rates: (..., n_rules) -> (..., n_traits)."""
+        return np.clip(self.base + (rates * gates) @ self.weights, 0.0, 100.0)
+
+    def score_batch(self, features: np.ndarray, mask: np.ndarray, topics: List[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score many users at once.
+
+        `features` is (n_users x max_tweets x n_features) with padding rows
+        masked out by `mask` (n_users x max_tweets). Returns the
+        (n_users x n_traits) scores and the (n_users x n_rules) firing rates.
+        """
+        activations = self.rule_activations(features) & mask[..., np.newaxis]
+        counts = mask.sum(axis=1, keepdims=True)
+        rates = activations.sum(axis=1) / np.maximum(counts, 1)
+        gates = np.vstack([self.topic_gates(user_topics) for user_topics in topics]) if topics else np.zeros((0, len(self.rules)))
+        return self.score_rates(rates, gates), rates
+
+
+def pad_batch(matrices: Sequence[np.ndarray], n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack per-user feature matrices into a padded 3-D batch plus its mask."""
+    longest = max((len(m) for m in matrices), default=0)
+    batch = np.zeros((len(matrices), longest, n_features), dtype=np.float32)
+    mask = np.zeros((len(matrices), longest), dtype=bool)
+    for i, matrix in enumerate(matrices):
+        batch[i, :len(matrix)] = matrix
+        mask[i, :len(matrix)] = True
+    return batch, mask
+
+
+def load_trait_scorer(keyword_categories: Sequence[str]) -> TraitScorer:
+    return TraitScorer.from_file(keyword_categories, os.environ.get("TRAIT_WEIGHTS_PATH", DEFAULT_WEIGHTS_PATH))
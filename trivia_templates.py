@@ -1,98 +1,255 @@
+import hashlib
+import random
+from string import Formatter
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+# A template's correct answer comes from its resolver in RESOLVERS when it has
+# one, otherwise from its static "correctAnswer" index.
 QUESTION_TEMPLATES = [
     {
+        "id": "superpower",
         "questionText": "What's {username}'s secret Twitter superpower?",
         "options": ["{superpower}", "Going viral with one word", "Predicting trends", "Endless retweets"],
         "correctAnswer": 0,
         "category": "Personality"
     },
     {
+        "id": "posting_time",
         "questionText": "When is {username} most likely to tweet?",
         "options": ["Morning", "Afternoon", "Evening", "3am"],
-        "correctAnswer": lambda report: 3 if "Night owl" in report["posting_style"] else 0,
         "category": "Posting Habits"
     },
     {
+        "id": "biggest_vibe",
         "questionText": "What's {username}'s biggest vibe?",
         "options": ["Chill Vibes CEO", "Meme King/Queen", "Deep Thinker", "Chaos Agent"],
-        "correctAnswer": lambda report: 1 if "Meme" in report["posting_style"] else 2,
         "category": "Vibe"
     },
     {
+        "id": "movie_genre",
         "questionText": "If {username} were a movie character, what genre would they be in?",
         "options": ["Sci-Fi", "Comedy", "Drama", "Action"],
-        "correctAnswer": None,
+        "correctAnswer": 0,
         "category": "Personality"
     },
     {
+        "id": "favorite_topic",
         "questionText": "What's {username}'s favorite topic to tweet about?",
         "options": ["{topic}", "Politics", "Food", "Travel"],
         "correctAnswer": 0,
         "category": "Topics"
     },
     {
+        "id": "secondary_topic",
         "questionText": "What's another topic {username} loves to tweet about?",
         "options": ["{secondary_topic}", "Fashion", "Sports", "Music"],
         "correctAnswer": 0,
         "category": "Topics"
     },
     {
+        "id": "quirk",
         "questionText": "What's {username}'s hidden quirk?",
         "options": ["{quirk}", "Sings to plants", "Collects rare coins", "Talks to their code"],
         "correctAnswer": 0,
         "category": "Personality"
     },
     {
+        "id": "motto",
         "questionText": "What's {username}'s Twitter motto?",
         "options": ["{motto}", "Keep it real", "YOLO", "Stay curious"],
         "correctAnswer": 0,
         "category": "Personality"
     },
     {
+        "id": "posting_style",
         "questionText": "What's {username}'s posting style?",
         "options": ["{posting_style}", "One-word wonders", "Essay threads", "GIF spam"],
         "correctAnswer": 0,
         "category": "Posting Habits"
     },
     {
+        "id": "drives",
         "questionText": "What drives {username}'s tweets?",
         "options": ["Innovation", "Humor", "Drama", "Chill vibes"],
-        "correctAnswer": lambda report: 0 if report["big5_traits"]["Openness"] >= 70 else 1,
         "category": "Personality"
     },
     {
+        "id": "nickname",
         "questionText": "What's {username}'s Twitter nickname vibe?",
         "options": ["{nickname}", "The Silent Sage", "The Meme Machine", "The Dream Weaver"],
         "correctAnswer": 0,
         "category": "Personality"
     },
     {
+        "id": "viral_for",
         "questionText": "If {username} went viral, what would it be for?",
         "options": ["Epic thread", "Hilarious meme", "Hot take", "Tech breakthrough"],
-        "correctAnswer": None,
+        "correctAnswer": 3,
         "category": "Vibe"
     },
     {
+        "id": "social_energy",
         "questionText": "What's {username}'s social media energy?",
         "options": ["Tech guru", "Meme maestro", "Philosopher", "Party starter"],
-        "correctAnswer": None,
         "category": "Vibe"
     },
     {
+        "id": "frequency_vibe",
         "questionText": "What's {username}'s tweet frequency vibe?",
         "options": ["Daily poster", "Ghost then flood", "Once a week", "Random bursts"],
-        "correctAnswer": lambda report: 1 if "Night owl" in report["posting_style"] else 0,
         "category": "Posting Habits"
     },
     {
+        "id": "personality_trait",
         "questionText": "What's {username}'s Twitter personality trait?",
         "options": ["Creative", "Organized", "Social", "Spicy"],
-        "correctAnswer": lambda report: 0 if report["big5_traits"]["Openness"] >= 70 else 2,
         "category": "Personality"
     },
     {
+        "id": "ideal_moment",
         "questionText": "What's {username}'s ideal Twitter moment?",
         "options": ["Viral meme", "Deep thread", "Tech debate", "Chill Q&A"],
-        "correctAnswer": None,
+        "correctAnswer": 2,
         "category": "Vibe"
     }
-]
\ No newline at end of file
+]
+
+
+class TriviaFacts:
+    """Everything a resolver may look at, computed once per trivia set."""
+
+    __slots__ = ("report", "topics", "habits", "is_chill_vibe")
+
+    def __init__(self, report: Dict, topics: Sequence[str], habits: Dict, is_chill_vibe: bool):
+        self.report = report
+        self.topics = topics
+        self.habits = habits  # temporal_features.posting_habits()
+        self.is_chill_vibe = is_chill_vibe
+
+    @property
+    def is_social(self) -> bool:
+        return "Social" in self.topics and self.report["big5_traits"]["Extraversion"] >= 65.0
+
+
+def _personality_trait(facts: TriviaFacts) -> int:
+    big5 = facts.report["big5_traits"]
+    trait_scores = {
+        "Creative": big5["Openness"],
+        "Organized": big5["Conscientiousness"],
+        "Social": big5["Extraversion"]
+    }
+    # Prioritize Social if topic includes Social and Extraversion >= 65.0
+    if facts.is_social:
+        max_trait = "Social"
+    else:
+        max_trait = max(trait_scores, key=lambda k: trait_scores[k] if trait_scores[k] >= 65.0 else -float('inf'))
+    return {"Creative": 0, "Organized": 1, "Social": 2}[max_trait]
+
+
+# Resolvers return an option index, or the option text itself for static options
+RESOLVERS: Dict[str, Callable[[TriviaFacts], Union[int, str]]] = {
+    "posting_time": lambda facts: facts.habits["peak_period"],
+    "drives": lambda facts: 0 if "Web3" in facts.topics else 1,
+    "social_energy": lambda facts: 3 if facts.is_social else 0,  # Party starter for social users
+    "personality_trait": _personality_trait,
+    "biggest_vibe": lambda facts: 0 if facts.is_chill_vibe else 2,  # Chill Vibes CEO if positive sentiment
+    "frequency_vibe": lambda facts: facts.habits["frequency"]
+}
+
+
+def _option_resolver(resolver: Callable[[TriviaFacts], Union[int, str]], options: Sequence[str]) -> Callable[[TriviaFacts], int]:
+    def resolve(facts: TriviaFacts) -> int:
+        answer = resolver(facts)
+        return options.index(answer) if isinstance(answer, str) else answer
+    return resolve
+
+# Literal text and field names alternating, pre-split from a format string
+Pieces = Tuple[str, ...]
+
+
+def _parse(text: str) -> Union[str, Pieces]:
+    """Plain strings stay as-is; strings with fields become (literal, field, literal, ...)."""
+    pieces = [""]
+    for literal, field, spec, conversion in Formatter().parse(text):
+        if spec or conversion:
+            raise ValueError(f"Trivia templates only support plain fields, got {{{field}!{conversion}:{spec}}}")
+        pieces[-1] += literal
+        if field is not None:
+            pieces += [field, ""]
+    return pieces[0] if len(pieces) == 1 else tuple(pieces)
+
+
+def _render(parsed: Union[str, Pieces], values: Dict) -> str:
+    if isinstance(parsed, str):
+        return parsed
+    return "".join(piece if i % 2 == 0 else str(values[piece]) for i, piece in enumerate(parsed))
+
+
+class CompiledTemplate:
+    __slots__ = ("id", "category", "question", "options", "fields", "resolve")
+
+    def __init__(self, spec: Dict):
+        self.id = spec["id"]
+        self.category = spec["category"]
+        self.question = _parse(spec["questionText"])
+        self.options = tuple(_parse(option) for option in spec["options"])
+        self.fields = frozenset(
+            piece for parsed in (self.question,) + self.options if not isinstance(parsed, str)
+            for piece in parsed[1::2]
+        )
+        if self.id in RESOLVERS:
+            self.resolve = _option_resolver(RESOLVERS[self.id], spec["options"])
+        elif spec.get("correctAnswer") is not None:
+            answer = spec["correctAnswer"]
+            self.resolve = lambda facts: answer
+        else:
+            raise ValueError(f"Trivia template {self.id} has neither a resolver nor a static correctAnswer")
+
+    def render(self, values: Dict) -> Tuple[str, List[str]]:
+        return _render(self.question, values), [_render(option, values) for option in self.options]
+
+
+def compile_templates(specs: Sequence[Dict]) -> Tuple[CompiledTemplate, ...]:
+    compiled = tuple(CompiledTemplate(spec) for spec in specs)
+    ids = [template.id for template in compiled]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Trivia template ids must be unique")
+    return compiled
+
+
+TEMPLATES = compile_templates(QUESTION_TEMPLATES)
+TEMPLATES_BY_ID = {template.id: template for template in TEMPLATES}
+TEMPLATES_BY_CATEGORY: Dict[str, Tuple[CompiledTemplate, ...]] = {}
+for _template in TEMPLATES:
+    TEMPLATES_BY_CATEGORY[_template.category] = TEMPLATES_BY_CATEGORY.get(_template.category, ()) + (_template,)
+TOPIC_TEMPLATES = TEMPLATES_BY_CATEGORY.get("Topics", ())
+OTHER_TEMPLATES = tuple(template for template in TEMPLATES if template.category != "Topics")
+TEMPLATE_FIELDS = frozenset(field for template in TEMPLATES for field in template.fields)
+
+
+def select_templates(rng, count: int = 15, topic_count: int = 2) -> List[CompiledTemplate]:
+    """`topic_count` Topics templates followed by the rest drawn from the other categories."""
+    topic_count = min(topic_count, len(TOPIC_TEMPLATES))
+    return rng.sample(TOPIC_TEMPLATES, topic_count) + rng.sample(OTHER_TEMPLATES, count - topic_count)
+
+
+def variant_rng(username: str, content_digest: str, variant) -> random.Random:
+    """Private RNG for one user, tweet set and variant, so concurrent requests never share state."""
+    seed = hashlib.sha256(f"{username}\0{content_digest}\0{variant}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(seed[:8], "big"))
+
+
+def select_variants(username: str, content_digest: str, variants: int, max_attempts: int = 20) -> List[List[CompiledTemplate]]:
+    """Template lists for `variants` games; a variant that repeats an earlier game's order is redrawn."""
+    seen = set()
+    games = []
+    for variant in range(variants):
+        rng = variant_rng(username, content_digest, variant)
+        for _ in range(max_attempts):
+            templates = select_templates(rng)
+            signature = tuple(template.id for template in templates)
+            if signature not in seen:
+                break
+        seen.add(signature)
+        games.append(templates)
+    return games
@@ -0,0 +1,167 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from temporal_features import parse_timestamps
+
+DEFAULT_CREATED_AT = "2025-01-01T00:00:00Z"
+# Joins tweets in the text buffers; a non-word character, so \b-anchored patterns never span two tweets
+SEPARATOR = "\n"
+
+
+def _offsets(lengths: Iterable[int]) -> np.ndarray:
+    """Start of each tweet in a SEPARATOR-joined buffer, plus one past the end (as if it had a trailing separator)."""
+    offsets = np.zeros(1, dtype=np.int64)
+    lengths = np.fromiter((length + len(SEPARATOR) for length in lengths), dtype=np.int64)
+    return np.concatenate((offsets, np.cumsum(lengths)))
+
+
+class TweetRecord:
+    """One tweet as a view into its TweetBatch; reads like the {"text", "created_at"} dict it replaces."""
+
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch: "TweetBatch", index: int):
+        self.batch = batch
+        self.index = index
+
+    @property
+    def text(self) -> str:
+        return self.batch.text_at(self.index)
+
+    @property
+    def lowered(self) -> str:
+        return self.batch.text_at(self.index, lowered=True)
+
+    @property
+    def created_at(self) -> str:
+        return self.batch.created_at[self.index]
+
+    @property
+    def timestamp(self) -> int:
+        return int(self.batch.timestamps[self.index])
+
+    def __getitem__(self, key: str):
+        if key not in ("text", "created_at"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class TweetBatch:
+    """A user's tweets as flat buffers instead of one dict per tweet.
+
+    All texts live in one string and their lowercased copy in another, with
+    int64 offsets marking where each tweet starts, so whole-batch passes (regex
+    scans, lengths) run over a single buffer and map matches back to tweets
+    with searchsorted. Per-tweet strings are only sliced out when a model needs
+    them. created_at is parsed into an int64 epoch-seconds array on first use.
+    """
+
+    __slots__ = ("text", "lowered", "offsets", "lowered_offsets", "created_at", "_texts", "_timestamps")
+
+    def __init__(self, texts: Sequence[str], created_at: Sequence[str]):
+        if len(texts) != len(created_at):
+            raise ValueError("Every tweet needs a created_at")
+        self.text = SEPARATOR.join(texts)
+        self.offsets = _offsets(len(text) for text in texts)
+        self.lowered = self.text.lower()
+        if len(self.lowered) == len(self.text):
+            self.lowered_offsets = self.offsets
+        else:
+            # A few characters change length when lowercased ("İ" -> "i̇"); index the lowered copy separately
+            lowered = [text.lower() for text in texts]
+            self.lowered = SEPARATOR.join(lowered)
+            self.lowered_offsets = _offsets(len(text) for text in lowered)
+        self.created_at = list(created_at)
+        self._texts = None
+        self._timestamps = None
+
+    @classmethod
+    def from_dicts(cls, tweets: Iterable[Dict], default_created_at: str = DEFAULT_CREATED_AT) -> "TweetBatch":
+        tweets = list(tweets)
+        return cls([t.get("text", "") for t in tweets], [t.get("created_at", default_created_at) for t in tweets])
+
+    @classmethod
+    def from_models(cls, tweets: Sequence) -> "TweetBatch":
+        """From request models (anything with .text and .created_at)."""
+        return cls([t.text for t in tweets], [t.created_at for t in tweets])
+
+    def __len__(self) -> int:
+        return len(self.created_at)
+
+    def __iter__(self) -> Iterator[TweetRecord]:
+        return (TweetRecord(self, i) for i in range(len(self)))
+
+    def __getitem__(self, index: int) -> TweetRecord:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return TweetRecord(self, index % len(self))
+
+    def __getstate__(self):
+        return self.texts(), self.created_at
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def text_at(self, index: int, lowered: bool = False) -> str:
+        buffer, offsets = (self.lowered, self.lowered_offsets) if lowered else (self.text, self.offsets)
+        return buffer[offsets[index]:offsets[index + 1] - len(SEPARATOR)]
+
+    def texts(self) -> List[str]:
+        """Per-tweet strings, sliced once and kept, for model input."""
+        if self._texts is None:
+            # One split unless some tweet itself contains the separator
+            if self.text.count(SEPARATOR) == len(self) - 1:
+                self._texts = self.text.split(SEPARATOR)
+            else:
+                self._texts = [self.text_at(i) for i in range(len(self))]
+        return self._texts
+
+    def lowered_texts(self) -> List[str]:
+        return [self.text_at(i, lowered=True) for i in range(len(self))]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets) - len(SEPARATOR)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        if self._timestamps is None:
+            self._timestamps = parse_timestamps(self.created_at)
+        return self._timestamps
+
+    def owners(self, positions: Sequence[int], lowered: bool = True) -> np.ndarray:
+        """Index of the tweet each buffer position falls in."""
+        offsets = self.lowered_offsets if lowered else self.offsets
+        return np.searchsorted(offsets, np.asarray(positions, dtype=np.int64), side="right") - 1
+
+    def contains(self, pattern: str, lowered: bool = False) -> np.ndarray:
+        """Per-tweet flags: does the regex `pattern` match inside the tweet."""
+        buffer = self.lowered if lowered else self.text
+        flags = np.zeros(len(self), dtype=bool)
+        flags[self.owners([m.start() for m in re.finditer(pattern, buffer)], lowered)] = True
+        return flags
+
+    def take(self, indices: Sequence[int]) -> "TweetBatch":
+        texts = self.texts()
+        return TweetBatch([texts[i] for i in indices], [self.created_at[i] for i in indices])
+
+    def to_dicts(self) -> List[Dict]:
+        return [{"text": text, "created_at": created_at} for text, created_at in zip(self.texts(), self.created_at)]
+
+
+# What analyzers accept: a TweetBatch, or {"text", "created_at"} dicts converted on entry
+Tweets = Union[TweetBatch, Iterable[Dict]]
+
+
+def as_batch(tweets: Tweets, default_created_at: Optional[str] = None) -> TweetBatch:
+    if isinstance(tweets, TweetBatch):
+        return tweets
+    return TweetBatch.from_dicts(tweets, default_created_at or DEFAULT_CREATED_AT)
@@ -0,0 +1,85 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, List
+
+READ_SIZE = 1 << 16
+
+
+def _iter_json_array(f, read_size: int) -> Iterator[Dict]:
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while not buffer:
+        chunk = f.read(read_size)
+        if not chunk:
+            break
+        buffer = chunk.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array of tweets")
+    pos = 1
+    eof = False
+    while True:
+        # Skip whitespace and separators between elements
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            # A value ending exactly at the buffer edge may continue in the next read
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            complete = False
+        if not complete:
+            if eof:
+                raise ValueError("Truncated JSON array of tweets")
+            chunk = f.read(read_size)
+            eof = not chunk
+            # Drop what has been consumed so memory stays bounded by one read plus one tweet
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+
+
+def _iter_ndjson(f) -> Iterator[Dict]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_tweets(path: str, read_size: int = READ_SIZE) -> Iterator[Dict]:
+    """Stream tweets from a JSON array file or an NDJSON file (one tweet per line)."""
+    with open(path, "r") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_json_array(f, read_size)
+        else:
+            yield from _iter_ndjson(f)
+
+
+def tweets_path(username: str) -> str:
+    for path in (f"{username}_tweets.json", f"{username}_tweets.ndjson", f"{username}_tweets.jsonl"):
+        if os.path.exists(path):
+            return path
+    return f"{username}_tweets.json"
+
+
+def stream_tweets(username: str) -> Iterator[Dict]:
+    return iter_tweets(tweets_path(username))
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk